@@ -0,0 +1,13 @@
+from zeldia.cache.cache import CacheSettings, EntityCache
+from zeldia.cache.messages import MessageCache
+from zeldia.cache.store import EntityStore, StoreConfig, StoreUsage
+
+
+__all__: tuple[str, ...] = (
+    "CacheSettings",
+    "EntityCache",
+    "EntityStore",
+    "MessageCache",
+    "StoreConfig",
+    "StoreUsage",
+)
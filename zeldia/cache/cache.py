@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import attrs
+import logging
+
+from typing import Any, Callable, Sequence, Tuple
+
+from zeldia.cache.messages import MessageCache
+from zeldia.cache.store import EntityStore, StoreConfig, StoreUsage, merge
+from zeldia.converters import payload_to_channel, payload_to_guild, payload_to_member, payload_to_user
+from zeldia.enums.cache_mode import CacheMode
+from zeldia.models.channel import Channel
+from zeldia.models.guild import Guild
+from zeldia.models.lazy import LazyMessage
+from zeldia.models.member import Member
+from zeldia.models.message import Message
+from zeldia.models.snowflake import Snowflake
+from zeldia.models.user import User
+
+
+logger = logging.getLogger(__name__)
+
+MemberKeyT = Tuple[Snowflake, Snowflake]
+
+
+def _lru(max_size: int) -> Callable[[], StoreConfig]:
+    return lambda: StoreConfig(mode=CacheMode.LRU, max_size=max_size)
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class CacheSettings:
+    # Bounded by default, a long running bot should never grow without limit.
+    # Pass StoreConfig() for a store that keeps everything.
+    guilds: StoreConfig = attrs.field(factory=_lru(50_000))
+    channels: StoreConfig = attrs.field(factory=_lru(200_000))
+    users: StoreConfig = attrs.field(factory=_lru(100_000))
+    members: StoreConfig = attrs.field(factory=_lru(50_000))
+    messages: int = 1000
+    messages_per_channel: int | None = None
+
+    @classmethod
+    def none(cls) -> "CacheSettings":
+        off = StoreConfig(mode=CacheMode.OFF)
+        return cls(guilds=off, channels=off, users=off, members=off, messages=0)
+
+
+class EntityCache:
+
+    MESSAGE_EVENTS: frozenset[str] = frozenset(
+        ("MESSAGE_CREATE", "MESSAGE_UPDATE", "MESSAGE_DELETE", "MESSAGE_DELETE_BULK")
+    )
+
+    __slots__: Sequence[str] = ("settings", "guilds", "channels", "users", "members", "messages", "_handlers")
+
+    guilds: EntityStore[Snowflake, Guild]
+    channels: EntityStore[Snowflake, Channel]
+    users: EntityStore[Snowflake, User]
+    members: EntityStore[MemberKeyT, Member]
+    messages: MessageCache | None
+
+    def __init__(self, settings: CacheSettings | None = None) -> None:
+        self.settings = CacheSettings() if settings is None else settings
+
+        self.guilds = EntityStore("guilds", self.settings.guilds)
+        self.channels = EntityStore("channels", self.settings.channels)
+        self.users = EntityStore("users", self.settings.users)
+        self.members = EntityStore("members", self.settings.members)
+        self.messages = (
+            MessageCache(self.settings.messages, self.settings.messages_per_channel)
+            if self.settings.messages
+            else None
+        )
+
+        self.channels.add_index("guild", lambda channel: channel.guild_id)
+        self.channels.add_index("type", lambda channel: channel.type)
+        self.members.add_index("guild", lambda member: member.guild_id)
+
+        self._handlers: dict[str, Callable[[dict[str, Any]], None]] = {
+            "READY": self._on_ready,
+            "GUILD_CREATE": self._on_guild_create,
+            "GUILD_UPDATE": self._on_guild_update,
+            "GUILD_DELETE": self._on_guild_delete,
+            "CHANNEL_CREATE": self._on_channel_update,
+            "CHANNEL_UPDATE": self._on_channel_update,
+            "CHANNEL_DELETE": self._on_channel_delete,
+            "THREAD_CREATE": self._on_channel_update,
+            "THREAD_UPDATE": self._on_channel_update,
+            "THREAD_DELETE": self._on_channel_delete,
+            "GUILD_MEMBER_ADD": self._on_member_update,
+            "GUILD_MEMBER_UPDATE": self._on_member_update,
+            "GUILD_MEMBER_REMOVE": self._on_member_remove,
+            "GUILD_MEMBERS_CHUNK": self._on_members_chunk,
+            "USER_UPDATE": self._on_user_update,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        stores = (self.guilds, self.channels, self.users, self.members)
+        return self.messages is not None or any(store.enabled for store in stores)
+
+    @property
+    def events(self) -> frozenset[str]:
+        if self.messages is None:
+            return frozenset(self._handlers)
+
+        return frozenset(self._handlers).union(self.MESSAGE_EVENTS)
+
+    def get_guild(self, guild_id: int) -> Guild | None:
+        return self.guilds.get(Snowflake(guild_id))
+
+    def get_channel(self, channel_id: int) -> Channel | None:
+        return self.channels.get(Snowflake(channel_id))
+
+    def get_user(self, user_id: int) -> User | None:
+        return self.users.get(Snowflake(user_id))
+
+    def get_member(self, guild_id: int, user_id: int) -> Member | None:
+        return self.members.get((Snowflake(guild_id), Snowflake(user_id)))
+
+    def get_message(self, message_id: int) -> Message | LazyMessage | None:
+        return None if self.messages is None else self.messages.get(Snowflake(message_id))
+
+    def channel_messages(self, channel_id: int) -> list[Message | LazyMessage]:
+        return [] if self.messages is None else self.messages.channel_messages(Snowflake(channel_id))
+
+    def guild_channels(self, guild_id: int) -> list[Channel]:
+        return self.channels.find("guild", Snowflake(guild_id))
+
+    def channels_of_type(self, channel_type: int) -> list[Channel]:
+        return self.channels.find("type", channel_type)
+
+    def guild_members(self, guild_id: int) -> list[Member]:
+        return self.members.find("guild", Snowflake(guild_id))
+
+    def memory_usage(self, sample: int = 100) -> dict[str, StoreUsage]:
+        usage = {
+            store.name: store.usage(sample)
+            for store in (self.guilds, self.channels, self.users, self.members)
+        }
+
+        if self.messages is not None:
+            usage["messages"] = self.messages.usage(sample)
+
+        return usage
+
+    def clear(self) -> None:
+        for store in (self.guilds, self.channels, self.users, self.members):
+            store.clear()
+
+        if self.messages is not None:
+            self.messages.clear()
+
+    def handle_event(self, event: str, data: dict[str, Any], model: Any = None) -> None:
+        handler = self._handlers.get(event)
+
+        try:
+            if handler is not None:
+                handler(data)
+
+            if self.messages is not None:
+                self.messages.handle_event(event, data, model)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            logger.exception("Failed to update the cache from %s", event)
+
+    def put_user(self, data: dict[str, Any]) -> User | None:
+        if not self.users.enabled:
+            return None
+
+        user = payload_to_user(data)
+        self.users.put(user.id, user)
+        return user
+
+    def put_member(self, data: dict[str, Any], guild_id: str | int) -> None:
+        # Members are keyed by their user, partial payloads without one can't be stored
+        if not data.get("user"):
+            return
+
+        if self.users.enabled:
+            self.put_user(data["user"])
+
+        if self.members.enabled:
+            member = payload_to_member(data, guild_id)
+            self.members.put((member.guild_id, member.user.id), member)
+
+    def _on_ready(self, data: dict[str, Any]) -> None:
+        self.put_user(data["user"])
+
+        if self.guilds.enabled:
+            for guild in data.get("guilds", ()):
+                self.guilds.put(Snowflake(guild["id"]), payload_to_guild(guild))
+
+    def _on_guild_create(self, data: dict[str, Any]) -> None:
+        guild_id = Snowflake(data["id"])
+
+        if self.guilds.enabled:
+            self.guilds.put(guild_id, payload_to_guild(data))
+
+        if self.channels.enabled:
+            for channel in (*data.get("channels", ()), *data.get("threads", ())):
+                self.channels.put(Snowflake(channel["id"]), payload_to_channel(channel, guild_id))
+
+        if self.members.enabled or self.users.enabled:
+            for member in data.get("members", ()):
+                self.put_member(member, guild_id)
+
+    def _on_guild_update(self, data: dict[str, Any]) -> None:
+        guild_id = Snowflake(data["id"])
+
+        if self.guilds.enabled:
+            self.guilds.put(guild_id, merge(self.guilds.get(guild_id), payload_to_guild(data), data))
+
+    def _on_guild_delete(self, data: dict[str, Any]) -> None:
+        guild_id = Snowflake(data["id"])
+
+        if data.get("unavailable"):
+            # Outage, the guild comes back with a GUILD_CREATE once it's available again
+            guild = self.guilds.get(guild_id)
+            if guild is not None:
+                guild.unavailable = True
+            return
+
+        self.guilds.pop(guild_id)
+
+        for channel_id in self.channels.keys_for("guild", guild_id):
+            self.channels.pop(channel_id)
+
+        for member_key in self.members.keys_for("guild", guild_id):
+            self.members.pop(member_key)
+
+    def _on_channel_update(self, data: dict[str, Any]) -> None:
+        if self.channels.enabled:
+            channel_id = Snowflake(data["id"])
+            self.channels.put(channel_id, merge(self.channels.get(channel_id), payload_to_channel(data), data))
+
+    def _on_channel_delete(self, data: dict[str, Any]) -> None:
+        self.channels.pop(Snowflake(data["id"]))
+
+    def _on_member_update(self, data: dict[str, Any]) -> None:
+        self.put_member(data, data["guild_id"])
+
+    def _on_member_remove(self, data: dict[str, Any]) -> None:
+        self.members.pop((Snowflake(data["guild_id"]), Snowflake(data["user"]["id"])))
+
+    def _on_members_chunk(self, data: dict[str, Any]) -> None:
+        for member in data.get("members", ()):
+            self.put_member(member, data["guild_id"])
+
+    def _on_user_update(self, data: dict[str, Any]) -> None:
+        self.put_user(data)
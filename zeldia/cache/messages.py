@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import collections
+import itertools
+
+from typing import Any, Iterator, Sequence
+
+from zeldia.cache.store import StoreUsage, deep_sizeof, merge
+from zeldia.converters import payload_to_message
+from zeldia.models.lazy import LazyMessage
+from zeldia.models.message import Message
+from zeldia.models.snowflake import Snowflake
+
+
+class MessageCache:
+
+    __slots__: Sequence[str] = (
+        "capacity",
+        "per_channel",
+        "_ring",
+        "_slots",
+        "_head",
+        "_messages",
+        "_channels",
+    )
+
+    def __init__(self, capacity: int = 1000, per_channel: int | None = None) -> None:
+        if capacity <= 0:
+            raise ValueError("The message cache needs a positive capacity.")
+
+        self.capacity = capacity
+        self.per_channel = per_channel
+
+        # Fixed size ring of ids in insertion order, the slot under the head is the
+        # oldest message and gets evicted first. Allocated once, never resized.
+        self._ring: list[Snowflake | None] = [None] * capacity
+        # Where each cached id sits in the ring, removals clear their slot so an id
+        # that's added again later isn't evicted early by its stale old slot
+        self._slots: dict[Snowflake, int] = {}
+        self._head = 0
+        self._messages: dict[Snowflake, Message | LazyMessage] = {}
+        self._channels: dict[Snowflake, collections.deque[Snowflake]] = {}
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._messages
+
+    def __iter__(self) -> Iterator[Message | LazyMessage]:
+        return iter(self._messages.values())
+
+    def get(self, message_id: int) -> Message | LazyMessage | None:
+        return self._messages.get(message_id)
+
+    def channel_messages(self, channel_id: int) -> list[Message | LazyMessage]:
+        ids = self._channels.get(channel_id, ())
+        return [self._messages[message_id] for message_id in ids]
+
+    def add(self, message: Message | LazyMessage) -> None:
+        message_id = Snowflake(message.id)
+
+        if message_id in self._messages:
+            self._messages[message_id] = message
+            return
+
+        oldest = self._ring[self._head]
+        if oldest is not None:
+            self.remove(oldest)
+
+        self._ring[self._head] = message_id
+        self._slots[message_id] = self._head
+        self._head = (self._head + 1) % self.capacity
+
+        channel_id = Snowflake(message.channel_id)
+        channel = self._channels.get(channel_id)
+
+        if channel is None:
+            channel = self._channels[channel_id] = collections.deque()
+        elif self.per_channel is not None and len(channel) >= self.per_channel:
+            self.remove(channel[0])
+
+            # remove() drops the deque once it's empty
+            channel = self._channels.setdefault(channel_id, channel)
+
+        channel.append(message_id)
+        self._messages[message_id] = message
+
+    def remove(self, message_id: int) -> Message | LazyMessage | None:
+        message = self._messages.pop(message_id, None)
+
+        if message is None:
+            return None
+
+        self._ring[self._slots.pop(message_id)] = None
+        channel_id = Snowflake(message.channel_id)
+        channel = self._channels[channel_id]
+
+        # Evictions almost always hit the oldest message of the channel
+        if channel[0] == message_id:
+            channel.popleft()
+        else:
+            channel.remove(message_id)
+
+        if not channel:
+            del self._channels[channel_id]
+
+        return message
+
+    def remove_channel(self, channel_id: int) -> None:
+        for message_id in tuple(self._channels.get(channel_id, ())):
+            self.remove(message_id)
+
+    def clear(self) -> None:
+        self._ring = [None] * self.capacity
+        self._slots.clear()
+        self._head = 0
+        self._messages.clear()
+        self._channels.clear()
+
+    def usage(self, sample: int = 100) -> StoreUsage:
+        messages = list(itertools.islice(self._messages.values(), sample))
+        per_entity = sum(deep_sizeof(message) for message in messages) / len(messages) if messages else 0.0
+
+        return StoreUsage(count=len(self._messages), total_bytes=int(per_entity * len(self)), per_entity=per_entity)
+
+    def handle_event(self, event: str, data: dict[str, Any], model: Any = None) -> None:
+        if event == "MESSAGE_CREATE":
+            self.add(model if isinstance(model, (Message, LazyMessage)) else payload_to_message(data))
+        elif event == "MESSAGE_UPDATE":
+            message_id = Snowflake(data["id"])
+            existing = self._messages.get(message_id)
+
+            if isinstance(existing, LazyMessage):
+                self._messages[message_id] = LazyMessage({**existing.raw, **data})
+            elif existing is not None:
+                self._messages[message_id] = merge(existing, payload_to_message(data), data)
+        elif event == "MESSAGE_DELETE":
+            self.remove(Snowflake(data["id"]))
+        elif event == "MESSAGE_DELETE_BULK":
+            for message_id in data["ids"]:
+                self.remove(Snowflake(message_id))
+        elif event in ("CHANNEL_DELETE", "THREAD_DELETE"):
+            self.remove_channel(Snowflake(data["id"]))
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import attrs
+import collections
+import itertools
+import sys
+
+from typing import Any, Callable, Generic, Hashable, Iterator, Sequence, TypeVar
+
+from zeldia.enums.cache_mode import CacheMode
+
+
+KeyT = TypeVar("KeyT", bound=Hashable)
+ValueT = TypeVar("ValueT")
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class StoreConfig:
+    mode: CacheMode = CacheMode.UNBOUNDED
+    max_size: int | None = None
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class StoreUsage:
+    count: int
+    total_bytes: int
+    per_entity: float
+
+
+def deep_sizeof(obj: Any, seen: set[int] | None = None) -> int:
+    if seen is None:
+        seen = set()
+
+    if id(obj) in seen:
+        return 0
+
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif attrs.has(type(obj)):
+        size += sum(deep_sizeof(getattr(obj, field.name), seen) for field in attrs.fields(type(obj)))
+    elif hasattr(type(obj), "__slots__"):
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                size += deep_sizeof(getattr(obj, slot, None), seen)
+
+    return size
+
+
+def merge(existing: ValueT | None, updated: ValueT, data: dict[str, Any]) -> ValueT:
+    # Partial updates (e.g. GUILD_UPDATE) only carry some of the fields, keep the rest.
+    if existing is None:
+        return updated
+
+    return attrs.evolve(
+        existing,
+        **{field.name: getattr(updated, field.name) for field in attrs.fields(type(updated)) if field.name in data},
+    )
+
+
+class EntityStore(Generic[KeyT, ValueT]):
+
+    __slots__: Sequence[str] = ("name", "mode", "max_size", "_items", "_indexes")
+
+    def __init__(self, name: str, config: StoreConfig | None = None) -> None:
+        config = StoreConfig() if config is None else config
+
+        self.name = name
+        self.mode = config.mode
+        self.max_size = config.max_size
+
+        if self.mode is CacheMode.LRU and not self.max_size:
+            raise ValueError(f"The {name} cache needs a max_size to be bounded.")
+
+        # Plain dicts are noticeably smaller, only pay for the ordering when evicting
+        self._items: dict[KeyT, ValueT] = collections.OrderedDict() if self.mode is CacheMode.LRU else {}
+        self._indexes: dict[str, tuple[Callable[[ValueT], Hashable], dict[Hashable, set[KeyT]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: KeyT) -> bool:
+        return key in self._items
+
+    def __iter__(self) -> Iterator[ValueT]:
+        return iter(self._items.values())
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not CacheMode.OFF
+
+    def add_index(self, name: str, key: Callable[[ValueT], Hashable]) -> None:
+        index: dict[Hashable, set[KeyT]] = collections.defaultdict(set)
+
+        for item_key, value in self._items.items():
+            index[key(value)].add(item_key)
+
+        self._indexes[name] = (key, index)
+
+    def get(self, key: KeyT) -> ValueT | None:
+        value = self._items.get(key)
+
+        if value is not None and self.mode is CacheMode.LRU:
+            self._items.move_to_end(key)
+
+        return value
+
+    def put(self, key: KeyT, value: ValueT) -> None:
+        if self.mode is CacheMode.OFF:
+            return
+
+        if key in self._items:
+            self._unindex(key, self._items[key])
+
+            if self.mode is CacheMode.LRU:
+                self._items.move_to_end(key)
+
+        self._items[key] = value
+        self._index(key, value)
+
+        if self.mode is CacheMode.LRU and len(self._items) > self.max_size:
+            self.pop(next(iter(self._items)))
+
+    def pop(self, key: KeyT) -> ValueT | None:
+        value = self._items.pop(key, None)
+
+        if value is not None:
+            self._unindex(key, value)
+
+        return value
+
+    def find(self, index: str, value: Hashable) -> list[ValueT]:
+        keys = self._indexes[index][1].get(value, ())
+        return [self._items[key] for key in keys]
+
+    def keys_for(self, index: str, value: Hashable) -> frozenset[KeyT]:
+        return frozenset(self._indexes[index][1].get(value, ()))
+
+    def clear(self) -> None:
+        self._items.clear()
+
+        for _, index in self._indexes.values():
+            index.clear()
+
+    def usage(self, sample: int = 100) -> StoreUsage:
+        # Sizing every entity of a 100k+ guild bot is too slow, extrapolate from a sample.
+        count = len(self._items)
+        sampled = list(itertools.islice(self._items.values(), sample))
+        per_entity = sum(deep_sizeof(value) for value in sampled) / len(sampled) if sampled else 0.0
+
+        return StoreUsage(count=count, total_bytes=int(per_entity * count), per_entity=per_entity)
+
+    def _index(self, key: KeyT, value: ValueT) -> None:
+        for key_func, index in self._indexes.values():
+            index[key_func(value)].add(key)
+
+    def _unindex(self, key: KeyT, value: ValueT) -> None:
+        for key_func, index in self._indexes.values():
+            index_key = key_func(value)
+            keys = index.get(index_key)
+
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[index_key]
@@ -3,9 +3,12 @@ from __future__ import annotations
 import asyncio
 from collections import defaultdict
 from typing import (
+    Any,
     Optional,
     Awaitable,
     Callable,
+    Iterable,
+    Literal,
     SupportsInt,
     TYPE_CHECKING,
     Sequence,
@@ -13,9 +16,18 @@ from typing import (
 
 import aiohttp
 
+from zeldia.cache.cache import CacheSettings, EntityCache
+from zeldia.codec import CodecTrait, get_codec
+from zeldia.dispatcher import EventDispatcher
+from zeldia.enums.overflow_policy import OverflowPolicy
+from zeldia.middleware import MiddlewarePipeline, MiddlewareT
 from zeldia.events import Events
 from zeldia.gateway.gateway import Gateway
+from zeldia.gateway.members import MemberChunkStream
+from zeldia.gateway.shard import ShardManager
 from zeldia.rest.rest import RESTClient
+from zeldia.rest.transport import HTTPTransport, TransportSettings
+from zeldia.waiters import CheckT, EventStream, WaiterRegistry
 
 if TYPE_CHECKING:
     from zeldia.flags.intents import Intents
@@ -28,8 +40,13 @@ class GatewayClient:
 
     __slots__: Sequence[str] = (
         "events",
+        "dispatcher",
+        "waiters",
+        "middleware",
+        "cache",
         "http",
-        "gateway",
+        "transport",
+        "shards",
         "_socket",
         "_interval",
         "_loop",
@@ -47,22 +64,100 @@ class GatewayClient:
         self,
         token: str,
         intents: SupportsInt | "Intents" | None = 0,
-        session: aiohttp.ClientSession = None,
+        session: aiohttp.ClientSession | None = None,
         zlib_compression: bool = False,
         http_client: RESTClient = None,
+        cache_settings: CacheSettings | None = None,
+        lazy_models: bool = False,
+        codec: CodecTrait | str | None = None,
+        typed_decoding: bool = False,
+        encoding: str = "json",
+        dispatcher: EventDispatcher | None = None,
+        shard_count: int | Literal["auto"] | None = None,
+        shard_ids: Iterable[int] | None = None,
+        transport_settings: TransportSettings | None = None,
         **options,
     ) -> None:
+        codec = get_codec(codec)
+
+        self._loop = options.pop("loop", asyncio.get_event_loop())
         self.events = defaultdict(list)
-        self.gateway = Gateway(
+        self.dispatcher = dispatcher or EventDispatcher()
+        self.waiters = WaiterRegistry()
+        self.middleware = MiddlewarePipeline(self.emit, self.dispatcher.schedule)
+        # One transport for REST and every shard, websockets connect outside the REST pool
+        if http_client is None:
+            self.transport = HTTPTransport(transport_settings, session)
+            self.http = RESTClient(token, session=self.transport, codec=codec)
+        else:
+            self.transport = http_client.transport
+            self.http = http_client
+
+        self.shards = ShardManager(
             token=token,
             intents=intents,
-            session=aiohttp.ClientSession() if not session else session,
-            compress=zlib_compression,
             emitter=self.emit,
+            session=self.transport,
+            rest=self.http,
+            shard_count=shard_count,
+            shard_ids=shard_ids,
+            compress=zlib_compression,
+            lazy_models=lazy_models,
+            codec=codec,
+            typed_decoding=typed_decoding,
+            encoding=encoding,
+            listening=self.is_listening,
+            middleware=self.middleware,
+            **options,
         )
-        self.http = RESTClient(token) if not http_client else http_client
+        self.cache = EntityCache(cache_settings)
 
-        self._loop = options.pop("loop", asyncio.get_event_loop())
+        if self.cache.enabled:
+            self.shards.add_dispatch_hook(self.cache.handle_event, self.cache.events)
+        if self.http.cache is not None:
+            self.shards.add_dispatch_hook(self.http.cache.handle_event, self.http.cache.INVALIDATIONS)
+
+        # Without sharding there's nothing to look up first, create the gateway right away
+        if shard_count is None:
+            self.shards.create_gateways()
+
+    @property
+    def gateway(self) -> Gateway | None:
+        return next(iter(self.shards.gateways.values()), None)
+
+    @property
+    def latencies(self) -> dict[int, float]:
+        return self.shards.latencies
+
+    def use(self, middleware: MiddlewareT, events: Iterable[str | Events] | None = None) -> MiddlewareT:
+        self.middleware.use(
+            middleware,
+            None if events is None else (event.value if isinstance(event, Events) else event for event in events),
+        )
+
+        return middleware
+
+    def request_members(
+        self,
+        guild_id: int,
+        *,
+        query: str | None = None,
+        user_ids: Iterable[int] | None = None,
+        limit: int = 0,
+        presences: bool = False,
+        timeout: float | None = 10.0,
+    ) -> MemberChunkStream:
+        gateway = self.shards.for_guild(guild_id)
+        if gateway is None:
+            raise ValueError(f"Guild {guild_id} isn't on any shard of this client.")
+
+        return gateway.request_guild_members(
+            guild_id, query=query, user_ids=user_ids, limit=limit, presences=presences, timeout=timeout
+        )
+
+    def is_listening(self, event: str) -> bool:
+        # Middleware sees every event it applies to, handlers or not
+        return bool(self.events.get(event)) or event in self.waiters or self.middleware.chain_for(event) is not None
 
     def on(self, event: str | Events) -> Callable[[EventCallbackT], EventCallbackT]:
         def register_handler(handler: EventCallbackT) -> EventCallbackT:
@@ -75,15 +170,24 @@ class GatewayClient:
         return register_handler
 
     def once(self, event: str | Events) -> Callable[[EventCallbackT], EventCallbackT]:
+        name = event.value if isinstance(event, Events) else event
+
         def register_handler(handler: EventCallbackT) -> EventCallbackT:
+            fired = False
+
             async def wrapper(*args, **kwargs) -> None:
-                await handler(*args, **kwargs)
+                nonlocal fired
 
-                self.off(event.value if isinstance(event, Events) else event, wrapper)
+                # Handlers run concurrently, a second event can reach the wrapper
+                # before the first call got to unregister it.
+                if fired:
+                    return
 
-            self.events[event.value if isinstance(event, Events) else event].append(
-                wrapper
-            )
+                fired = True
+                self.off(name, wrapper)
+                await handler(*args, **kwargs)
+
+            self.events[name].append(wrapper)
 
             return handler
 
@@ -92,15 +196,57 @@ class GatewayClient:
     def off(self, event: str, handler: Optional[EventCallbackT] = None) -> None:
         if handler is None:
             self.events[event] = []
-        else:
+        elif handler in self.events[event]:
             self.events[event].remove(handler)
 
+    async def wait_for(
+        self,
+        event: str | Events,
+        check: CheckT | None = None,
+        timeout: float | None = None,
+    ) -> Any:
+        return await self.waiters.wait_for(event.value if isinstance(event, Events) else event, check, timeout)
+
+    def stream(
+        self,
+        event: str | Events,
+        check: CheckT | None = None,
+        *,
+        maxsize: int = 100,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        timeout: float | None = None,
+    ) -> EventStream:
+        # Registered right away so nothing is missed before iteration starts,
+        # use it as `async with` (or close() it) to unregister.
+        stream = EventStream(
+            self.waiters,
+            event.value if isinstance(event, Events) else event,
+            check,
+            maxsize=maxsize,
+            overflow=overflow,
+            timeout=timeout,
+        )
+        self.waiters.add(stream)
+
+        return stream
+
     async def emit(self, event: str, *args, **kwargs) -> None:
-        for handler in self.events[event]:
-            await handler(*args, **kwargs)
+        # `get`, so unhandled events don't grow the defaultdict. The tuple is a
+        # snapshot, handlers may unregister themselves while running.
+        self.waiters.notify(event, args)
+        handlers = self.events.get(event)
+
+        if handlers:
+            await self.dispatcher.dispatch(event, tuple(handlers), args, kwargs)
+
+    async def close(self) -> None:
+        await self.shards.close()
+        await self.transport.close()
 
     def login(self) -> None:
         try:
-            self._loop.run_until_complete(self.gateway.connect())
+            self._loop.run_until_complete(self.shards.start())
         except KeyboardInterrupt:
-            self._loop.run_until_complete(self.gateway.close())
+            self._loop.run_until_complete(self.shards.close())
+        finally:
+            self._loop.run_until_complete(self.transport.close())
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import abc
+import json
+
+from typing import Any, Callable, Sequence
+
+
+class CodecTrait(abc.ABC):
+    name: str
+
+    @abc.abstractmethod
+    def loads(self, data: bytes | str) -> Any:
+        # Malformed input raises ValueError whatever the backend
+        ...
+
+    @abc.abstractmethod
+    def dumps(self, obj: Any) -> str:
+        ...
+
+
+class StdlibCodec(CodecTrait):
+
+    __slots__: Sequence[str] = ()
+
+    name = "json"
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+
+class OrjsonCodec(CodecTrait):
+
+    __slots__: Sequence[str] = ("_orjson",)
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._orjson = orjson
+
+    def loads(self, data: bytes | str) -> Any:
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self._orjson.dumps(obj).decode("UTF-8")
+
+
+class UjsonCodec(CodecTrait):
+
+    __slots__: Sequence[str] = ("_ujson",)
+
+    name = "ujson"
+
+    def __init__(self) -> None:
+        import ujson
+
+        self._ujson = ujson
+
+    def loads(self, data: bytes | str) -> Any:
+        return self._ujson.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self._ujson.dumps(obj, ensure_ascii=False)
+
+
+class MsgspecCodec(CodecTrait):
+
+    __slots__: Sequence[str] = ("_decoder", "_encoder", "_error")
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder()
+        self._error = msgspec.DecodeError
+
+    def loads(self, data: bytes | str) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except self._error as error:
+            # Unlike the other backends msgspec's error isn't a ValueError
+            raise ValueError(str(error)) from error
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode("UTF-8")
+
+
+CODECS: dict[str, Callable[[], CodecTrait]] = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "ujson": UjsonCodec,
+    "json": StdlibCodec,
+}
+
+
+def get_codec(codec: CodecTrait | str | None = None) -> CodecTrait:
+    if isinstance(codec, CodecTrait):
+        return codec
+
+    if codec is not None:
+        try:
+            return CODECS[codec]()
+        except KeyError:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {', '.join(CODECS)}.") from None
+
+    # Auto detect, fastest first. CODECS is ordered by preference.
+    for factory in CODECS.values():
+        try:
+            return factory()
+        except ImportError:
+            continue
+
+    return StdlibCodec()
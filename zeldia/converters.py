@@ -2,7 +2,12 @@ from __future__ import annotations
 
 from typing import Any
 
+from zeldia.models.channel import Channel
+from zeldia.models.guild import Guild
+from zeldia.models.member import Member
 from zeldia.models.message import Message
+from zeldia.models.snowflake import Snowflake
+from zeldia.models.user import User
 
 
 def payload_to_message(payload: dict[str, Any]) -> Message:
@@ -38,3 +43,121 @@ def payload_to_message(payload: dict[str, Any]) -> Message:
         stickers=payload.get("stickers", None),
         position=payload.get("position", None),
     )
+
+
+def _snowflake(value: str | int | None) -> Snowflake | None:
+    return None if value is None else Snowflake(value)
+
+
+def payload_to_user(payload: dict[str, Any]) -> User:
+    return User(
+        id=Snowflake(payload["id"]),
+        username=payload.get("username"),
+        discriminator=payload.get("discriminator"),
+        avatar=payload.get("avatar"),
+        bot=payload.get("bot", None),
+        system=payload.get("system", None),
+        mfa_enabled=payload.get("mfa_enabled", None),
+        banner=payload.get("banner", None),
+        accent_color=payload.get("accent_color", None),
+        locale=payload.get("locale", None),
+        verified=payload.get("verified", None),
+        email=payload.get("email", None),
+        flags=payload.get("flags", None),
+        premium_type=payload.get("premium_type", None),
+        public_flags=payload.get("public_flags", None),
+    )
+
+
+def payload_to_channel(payload: dict[str, Any], guild_id: str | int | None = None) -> Channel:
+    return Channel(
+        id=Snowflake(payload["id"]),
+        type=payload.get("type"),
+        guild_id=_snowflake(payload.get("guild_id", guild_id)),
+        position=payload.get("position", None),
+        permission_overwrites=payload.get("permission_overwrites", None),
+        name=payload.get("name", None),
+        topic=payload.get("topic", None),
+        nsfw=payload.get("nsfw", None),
+        last_message_id=_snowflake(payload.get("last_message_id", None)),
+        bitrate=payload.get("bitrate", None),
+        user_limit=payload.get("user_limit", None),
+        rate_limit_per_user=payload.get("rate_limit_per_user", None),
+        recipents=payload.get("recipients", None),
+        icon=payload.get("icon", None),
+        owner_id=_snowflake(payload.get("owner_id", None)),
+        application_id=_snowflake(payload.get("application_id", None)),
+        parent_id=_snowflake(payload.get("parent_id", None)),
+        last_pin_timestamp=payload.get("last_pin_timestamp", None),
+        rtc_region=payload.get("rtc_region", None),
+        video_quality_mode=payload.get("video_quality_mode", None),
+        message_count=payload.get("message_count", None),
+        member_count=payload.get("member_count", None),
+        thread_metadata=payload.get("thread_metadata", None),
+        member=payload.get("member", None),
+        default_auto_archive_duration=payload.get("default_auto_archive_duration", None),
+        permissions=payload.get("permissions", None),
+        flags=payload.get("flags", None),
+        total_message_sent=payload.get("total_message_sent", None),
+        available_tags=payload.get("available_tags", None),
+        applied_tags=payload.get("applied_tags", None),
+        default_reaction_emoji=payload.get("default_reaction_emoji", None),
+        default_thread_rate_limit_per_user=payload.get("default_thread_rate_limit_per_user", None),
+        default_sort_order=payload.get("default_sort_order", None),
+    )
+
+
+def payload_to_guild(payload: dict[str, Any]) -> Guild:
+    return Guild(
+        id=Snowflake(payload["id"]),
+        name=payload.get("name", None),
+        icon=payload.get("icon", None),
+        splash=payload.get("splash", None),
+        discovery_splash=payload.get("discovery_splash", None),
+        owner_id=_snowflake(payload.get("owner_id", None)),
+        afk_channel_id=_snowflake(payload.get("afk_channel_id", None)),
+        afk_timeout=payload.get("afk_timeout", None),
+        verification_level=payload.get("verification_level", None),
+        default_message_notifications=payload.get("default_message_notifications", None),
+        explicit_content_filter=payload.get("explicit_content_filter", None),
+        roles=payload.get("roles", []),
+        emojis=payload.get("emojis", []),
+        features=payload.get("features", []),
+        mfa_level=payload.get("mfa_level", None),
+        application_id=_snowflake(payload.get("application_id", None)),
+        system_channel_id=_snowflake(payload.get("system_channel_id", None)),
+        system_channel_flags=payload.get("system_channel_flags", None),
+        rules_channel_id=_snowflake(payload.get("rules_channel_id", None)),
+        max_members=payload.get("max_members", None),
+        vanity_url_code=payload.get("vanity_url_code", None),
+        description=payload.get("description", None),
+        banner=payload.get("banner", None),
+        premium_tier=payload.get("premium_tier", None),
+        premium_subscription_count=payload.get("premium_subscription_count", None),
+        preferred_locale=payload.get("preferred_locale", None),
+        public_updates_channel_id=_snowflake(payload.get("public_updates_channel_id", None)),
+        nsfw_level=payload.get("nsfw_level", None),
+        premium_progress_bar_enabled=payload.get("premium_progress_bar_enabled", None),
+        member_count=payload.get("member_count", None),
+        large=payload.get("large", None),
+        unavailable=payload.get("unavailable", None),
+    )
+
+
+def payload_to_member(payload: dict[str, Any], guild_id: str | int | None = None) -> Member:
+    user = payload.get("user")
+
+    return Member(
+        guild_id=_snowflake(payload.get("guild_id", guild_id)),
+        user=payload_to_user(user) if user else None,
+        nick=payload.get("nick", None),
+        avatar=payload.get("avatar", None),
+        roles=[Snowflake(role) for role in payload.get("roles", ())],
+        joined_at=payload.get("joined_at", None),
+        premium_since=payload.get("premium_since", None),
+        deaf=payload.get("deaf", None),
+        mute=payload.get("mute", None),
+        pending=payload.get("pending", None),
+        permissions=payload.get("permissions", None),
+        communication_disabled_until=payload.get("communication_disabled_until", None),
+    )
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import asyncio
+import attrs
+import collections
+import contextvars
+import functools
+import inspect
+import logging
+import time
+
+from typing import Any, Awaitable, Callable, Hashable, Sequence
+
+from zeldia.gateway.runner import LatencyHistogram
+
+
+logger = logging.getLogger(__name__)
+
+HandlerT = Callable[..., Awaitable[None]]
+ErrorHookT = Callable[[str, HandlerT, Exception], "Awaitable[None] | None"]
+KeyT = Callable[[Any], Hashable]
+ThunkT = Callable[[], Awaitable[None]]
+
+# Set while scheduled work runs. It was admitted under backpressure already and
+# may sit in an ordered queue ahead of the very handlers that hold the pending
+# slots, waiting for room from in there would never end.
+_admitted: contextvars.ContextVar[bool] = contextvars.ContextVar("_admitted", default=False)
+
+
+def attribute_key(name: str) -> KeyT:
+    # Works for attrs models, lazy models, typed structs and raw dicts alike
+    def key(model: Any) -> Hashable:
+        if isinstance(model, dict):
+            return model.get(name)
+
+        return getattr(model, name, None)
+
+    return key
+
+
+by_channel = attribute_key("channel_id")
+by_guild = attribute_key("guild_id")
+
+
+class _Unlimited:
+    # Stands in for a missing semaphore, contextlib.nullcontext only works with
+    # `async with` from 3.10 on
+
+    __slots__: Sequence[str] = ()
+
+    async def __aenter__(self) -> None:
+        ...
+
+    async def __aexit__(self, *_: Any) -> None:
+        ...
+
+
+UNLIMITED = _Unlimited()
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class EventStats:
+    dispatched: int = 0
+    completed: int = 0
+    failed: int = 0
+    in_flight: int = 0
+    latency: LatencyHistogram = attrs.field(factory=LatencyHistogram, repr=False)
+
+
+class EventDispatcher:
+
+    __slots__: Sequence[str] = (
+        "max_concurrency",
+        "limits",
+        "ordering",
+        "error_hook",
+        "max_pending",
+        "stats",
+        "_global",
+        "_semaphores",
+        "_queues",
+        "_tasks",
+        "_pending",
+        "_scheduled",
+        "_not_full",
+    )
+
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        limits: dict[str, int] | None = None,
+        ordering: dict[str, KeyT] | None = None,
+        error_hook: ErrorHookT | None = None,
+        max_pending: int | None = 10_000,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.limits = dict(limits or {})
+        self.ordering = dict(ordering or {})
+        self.error_hook = error_hook
+        self.max_pending = max_pending
+        self.stats: dict[str, EventStats] = collections.defaultdict(EventStats)
+
+        # Semaphores and the event are made on first use: before 3.10 they bind to
+        # the loop current at creation, and clients are built before the loop runs
+        self._global: asyncio.Semaphore | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._queues: dict[tuple[str, Hashable], collections.deque[ThunkT]] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._pending = 0
+        self._scheduled = 0
+        self._not_full: asyncio.Event | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def scheduled(self) -> int:
+        return self._scheduled
+
+    @property
+    def queue_depths(self) -> dict[tuple[str, Hashable], int]:
+        return {key: len(queue) for key, queue in self._queues.items()}
+
+    def limit(self, event: str, concurrency: int) -> None:
+        self.limits[event] = concurrency
+        self._semaphores.pop(event, None)
+
+    def order_by(self, event: str, key: KeyT) -> None:
+        self.ordering[event] = key
+
+    async def dispatch(self, event: str, handlers: Sequence[HandlerT], args: tuple, kwargs: dict) -> None:
+        # Handlers run as tasks so the gateway read loop only ever waits here when
+        # too much work is queued up, which is the backpressure we want.
+        await self._reserve(len(handlers))
+        self.stats[event].dispatched += 1
+
+        key_func = self.ordering.get(event)
+        if key_func is None:
+            for handler in handlers:
+                self._spawn(self._invoke(event, handler, args, kwargs))
+            return
+
+        self._enqueue(event, key_func(args[0] if args else None), functools.partial(
+            self._invoke_all, event, handlers, args, kwargs
+        ))
+
+    async def schedule(self, coro: Awaitable[None], event: str | None = None, model: Any = None) -> None:
+        # Work around the handlers, like a middleware chain, runs off the read
+        # loop under the same backpressure. It doesn't hold a handler slot, the
+        # handlers it dispatches itself would otherwise wait on it forever.
+        # For ordered events it joins the event's queue, so whatever it passes
+        # on reaches the handlers in the order the events arrived.
+        while self.max_pending is not None and self._pending + self._scheduled >= self.max_pending:
+            await self._wait_for_room()
+
+        self._scheduled += 1
+        key_func = None if event is None else self.ordering.get(event)
+
+        if key_func is None:
+            self._spawn(self._run_scheduled(coro))
+        else:
+            self._enqueue(event, key_func(model), functools.partial(self._run_scheduled, coro))
+
+    def _enqueue(self, event: str, key: Hashable, thunk: ThunkT) -> None:
+        # Same key, same order: work queues up behind a single runner per key
+        queue = self._queues.get((event, key))
+
+        if queue is not None:
+            queue.append(thunk)
+            return
+
+        self._queues[(event, key)] = collections.deque((thunk,))
+        self._spawn(self._run_ordered((event, key)))
+
+    async def drain(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*tuple(self._tasks), return_exceptions=True)
+
+    async def _reserve(self, count: int) -> None:
+        if _admitted.get():
+            self._pending += count
+            return
+
+        # Re-checked after every wakeup, several dispatches may be woken by one
+        # release. A batch bigger than the limit still gets through on its own.
+        while self.max_pending is not None and self._pending and self._pending + count > self.max_pending:
+            await self._wait_for_room()
+
+        self._pending += count
+
+    async def _wait_for_room(self) -> None:
+        if self._not_full is None:
+            self._not_full = asyncio.Event()
+
+        self._not_full.clear()
+        await self._not_full.wait()
+
+    def _notify_room(self) -> None:
+        if self._not_full is not None and (self.max_pending is None or self._pending < self.max_pending):
+            self._not_full.set()
+
+    def _release(self) -> None:
+        self._pending -= 1
+        self._notify_room()
+
+    async def _run_scheduled(self, coro: Awaitable[None]) -> None:
+        token = _admitted.set(True)
+
+        try:
+            await coro
+        finally:
+            _admitted.reset(token)
+            self._scheduled -= 1
+            self._notify_room()
+
+    def _semaphore_for(self, event: str) -> asyncio.Semaphore | None:
+        semaphore = self._semaphores.get(event)
+        if semaphore is None and event in self.limits:
+            semaphore = self._semaphores[event] = asyncio.Semaphore(self.limits[event])
+
+        return semaphore
+
+    def _global_semaphore(self) -> asyncio.Semaphore | None:
+        if self._global is None and self.max_concurrency:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+
+        return self._global
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_ordered(self, key: tuple[str, Hashable]) -> None:
+        queue = self._queues[key]
+
+        try:
+            while queue:
+                await queue.popleft()()
+        finally:
+            del self._queues[key]
+
+    async def _invoke_all(self, event: str, handlers: Sequence[HandlerT], args: tuple, kwargs: dict) -> None:
+        await asyncio.gather(*(self._invoke(event, handler, args, kwargs) for handler in handlers))
+
+    async def _invoke(self, event: str, handler: HandlerT, args: tuple, kwargs: dict) -> None:
+        stats = self.stats[event]
+        semaphore = self._semaphore_for(event)
+
+        try:
+            async with semaphore or UNLIMITED, self._global_semaphore() or UNLIMITED:
+                stats.in_flight += 1
+                started = time.perf_counter()
+
+                try:
+                    await handler(*args, **kwargs)
+                except Exception as error:
+                    stats.failed += 1
+                    await self._handle_error(event, handler, error)
+                else:
+                    stats.completed += 1
+                finally:
+                    stats.in_flight -= 1
+                    stats.latency.record(time.perf_counter() - started)
+        finally:
+            self._release()
+
+    async def _handle_error(self, event: str, handler: HandlerT, error: Exception) -> None:
+        if self.error_hook is None:
+            logger.error("Handler %r for %s raised", handler, event, exc_info=error)
+            return
+
+        try:
+            result = self.error_hook(event, handler, error)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("Error hook failed while handling an error from %r", handler)
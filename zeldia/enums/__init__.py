@@ -1,10 +1,16 @@
+from zeldia.enums.cache_mode import CacheMode
+from zeldia.enums.gateway_status import GatewayStatus
 from zeldia.enums.interaction import InteractionType
 from zeldia.enums.opcodes import OPCodes
+from zeldia.enums.overflow_policy import OverflowPolicy
 from zeldia.enums.channel_type import ChannelType
 
 
 __all__: tuple[str, ...] = (
+    "CacheMode",
+    "GatewayStatus",
     "InteractionType",
     "OPCodes",
+    "OverflowPolicy",
     "ChannelType"
 )
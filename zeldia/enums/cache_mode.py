@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from enum import Enum
+
+
+class CacheMode(Enum):
+    OFF = "off"
+    LRU = "lru"
+    UNBOUNDED = "unbounded"
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from enum import Enum
+
+
+class GatewayStatus(Enum):
+    DISCONNECTED = "disconnected"
+    CONNECTING = "connecting"
+    IDENTIFYING = "identifying"
+    RESUMING = "resuming"
+    CONNECTED = "connected"
+    CLOSED = "closed"
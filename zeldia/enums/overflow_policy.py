@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from enum import Enum
+
+
+class OverflowPolicy(Enum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    CLOSE = "close"
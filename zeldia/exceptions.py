@@ -8,3 +8,15 @@ class InvalidRequest(Exception):
 
 class MissingPermission(Exception):
     ...
+
+
+class RetriesExhausted(InvalidRequest):
+    ...
+
+
+class GatewayClosed(ZeldiaBaseException):
+    ...
+
+
+class StreamOverflow(ZeldiaBaseException):
+    ...
@@ -1,10 +1,44 @@
-from zeldia.gateway.gateway import Gateway, GATEWAY_URL_MAP
-from zeldia.gateway.runner import Runner, RunnerTrait
+from zeldia.gateway.cluster import ClusterSupervisor, ClusterWorker, WorkerConfig
+from zeldia.gateway.commands import CommandQueue
+from zeldia.gateway.compression import (
+    DecompressorTrait,
+    TransportStats,
+    ZlibStreamDecompressor,
+    ZstdStreamDecompressor,
+    get_decompressor,
+)
+from zeldia.gateway.gateway import Gateway, GATEWAY_URL_MAP, current_shard
+from zeldia.gateway.members import MemberChunk, MemberChunkStream, MemberRequests
+from zeldia.gateway.recorder import FrameReader, FrameRecorder, ReplayStats, replay
+from zeldia.gateway.runner import LatencyHistogram, Runner, RunnerTrait
+from zeldia.gateway.shard import IdentifyLimiter, ShardManager, get_current_shard, shard_for
 
 
 __all__: tuple[str, ...] = (
+    "ClusterSupervisor",
+    "ClusterWorker",
+    "CommandQueue",
+    "DecompressorTrait",
+    "FrameReader",
+    "FrameRecorder",
     "Gateway",
     "GATEWAY_URL_MAP",
+    "IdentifyLimiter",
+    "LatencyHistogram",
+    "MemberChunk",
+    "MemberChunkStream",
+    "MemberRequests",
+    "ReplayStats",
     "Runner",
     "RunnerTrait",
+    "ShardManager",
+    "TransportStats",
+    "WorkerConfig",
+    "ZlibStreamDecompressor",
+    "ZstdStreamDecompressor",
+    "current_shard",
+    "get_decompressor",
+    "get_current_shard",
+    "replay",
+    "shard_for",
 )
@@ -0,0 +1,434 @@
+from __future__ import annotations
+
+import asyncio
+import attrs
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Literal, Sequence, Tuple, TYPE_CHECKING
+
+from zeldia.gateway.shard import IdentifyLimiter
+
+if TYPE_CHECKING:
+    from multiprocessing.context import SpawnProcess
+
+    from zeldia.client import GatewayClient
+
+
+logger = logging.getLogger(__name__)
+
+# Every IPC message is a (kind, shard_id, payload) tuple sent over a duplex Pipe.
+#
+# worker -> supervisor: "identify" (asks for an identify slot), "stats"
+# supervisor -> worker: "identify_ok", "reconnect", "presence", "stop"
+MessageT = Tuple[str, "int | None", Any]
+
+SetupT = Callable[["GatewayClient"], None]
+
+
+@attrs.define(frozen=True)
+class WorkerConfig:
+    # Sent to the child process, everything in here has to be picklable. Codecs
+    # should be given by name and `setup` has to be a module level function.
+    worker_id: int
+    token: str
+    intents: Any
+    shard_ids: tuple[int, ...]
+    shard_count: int
+    setup: SetupT | None = None
+    stats_interval: float = 5.0
+    options: dict[str, Any] = attrs.field(factory=dict)
+
+
+def split_shards(shard_ids: Sequence[int], workers: int) -> list[tuple[int, ...]]:
+    # Contiguous chunks, so a worker's shards land in as few identify buckets as possible
+    size, extra = divmod(len(shard_ids), workers)
+    chunks, start = [], 0
+
+    for index in range(workers):
+        end = start + size + (index < extra)
+        if end > start:
+            chunks.append(tuple(shard_ids[start:end]))
+        start = end
+
+    return chunks
+
+
+async def receive(conn: Connection, executor: concurrent.futures.Executor) -> MessageT | None:
+    # Pipes can't be awaited portably, a blocking recv in a thread works with
+    # every event loop. A closed pipe (the other side died) reads as None.
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, conn.recv)
+    except (EOFError, OSError):
+        return None
+
+
+def send(conn: Connection, message: MessageT) -> bool:
+    try:
+        conn.send(message)
+    except OSError:
+        return False
+
+    return True
+
+
+class RemoteIdentifyLimiter:
+    # Stands in for IdentifyLimiter inside a worker, every identify asks the
+    # supervisor so the max_concurrency buckets hold across all processes.
+
+    __slots__: Sequence[str] = ("_conn", "_waiters")
+
+    def __init__(self, conn: Connection) -> None:
+        self._conn = conn
+        self._waiters: dict[int, asyncio.Future[None]] = {}
+
+    async def acquire(self, shard_id: int) -> None:
+        waiter = self._waiters[shard_id] = asyncio.get_running_loop().create_future()
+        send(self._conn, ("identify", shard_id, None))
+
+        try:
+            await waiter
+        finally:
+            self._waiters.pop(shard_id, None)
+
+    def release(self, shard_id: int) -> None:
+        waiter = self._waiters.get(shard_id)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+
+class ClusterWorker:
+
+    __slots__: Sequence[str] = ("config", "client", "_conn", "_limiter", "_executor")
+
+    def __init__(self, config: WorkerConfig, conn: Connection) -> None:
+        self.config = config
+        self._conn = conn
+        self._limiter = RemoteIdentifyLimiter(conn)
+        self._executor = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="zeldia-ipc")
+
+        self.client: GatewayClient | None = None
+
+    def stats(self) -> dict[int, dict[str, Any]]:
+        return {
+            shard_id: {
+                "status": gateway.status.value,
+                "latency": gateway.latency,
+                "latency_p99": gateway.latency_histogram.percentile(99),
+                "events": gateway.dispatched,
+                "skipped": gateway.skipped,
+                "queued": gateway.commands.depth,
+                "queue_wait_p99": gateway.commands.waits.percentile(99),
+            }
+            for shard_id, gateway in self.client.shards.gateways.items()
+        }
+
+    async def run(self) -> None:
+        from zeldia.client import GatewayClient
+
+        config = self.config
+        self.client = GatewayClient(
+            config.token,
+            intents=config.intents,
+            shard_count=config.shard_count,
+            shard_ids=config.shard_ids,
+            **config.options,
+        )
+        self.client.shards.identify_limiter = self._limiter
+
+        if config.setup is not None:
+            config.setup(self.client)
+
+        tasks = (
+            asyncio.ensure_future(self._listen()),
+            asyncio.ensure_future(self._report()),
+        )
+
+        try:
+            await self.client.shards.start()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            await self.client.transport.close()
+            self._executor.shutdown(wait=False)
+
+    async def _listen(self) -> None:
+        while (message := await receive(self._conn, self._executor)) is not None:
+            kind, shard_id, payload = message
+
+            try:
+                await self.handle_command(kind, shard_id, payload)
+            except Exception:
+                logger.exception("Worker %d failed to handle %r for shard %s", self.config.worker_id, kind, shard_id)
+
+        # The supervisor is gone, there's nobody left to grant identifies
+        await self.client.shards.close()
+
+    async def handle_command(self, kind: str, shard_id: int | None, payload: Any) -> None:
+        if kind == "identify_ok":
+            self._limiter.release(shard_id)
+        elif kind == "reconnect":
+            await self.client.shards.reconnect(shard_id)
+        elif kind == "presence":
+            await self.client.shards.gateways[shard_id].update_presence(payload)
+        elif kind == "stop":
+            await self.client.shards.close()
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.stats_interval)
+            send(self._conn, ("stats", None, self.stats()))
+
+
+def run_worker(config: WorkerConfig, conn: Connection) -> None:
+    # Entry point of the child process, each worker gets its own event loop
+    try:
+        asyncio.run(ClusterWorker(config, conn).run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+class WorkerHandle:
+
+    __slots__: Sequence[str] = ("worker_id", "shard_ids", "process", "conn", "stats", "restarts", "_listener")
+
+    def __init__(self, worker_id: int, shard_ids: tuple[int, ...]) -> None:
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.process: SpawnProcess | None = None
+        self.conn: Connection | None = None
+        self.stats: dict[int, dict[str, Any]] = {}
+        self.restarts = 0
+        self._listener: asyncio.Task[None] | None = None
+
+    def __repr__(self) -> str:
+        return f"WorkerHandle(worker_id={self.worker_id}, shard_ids={self.shard_ids}, restarts={self.restarts})"
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class ClusterSupervisor:
+
+    __slots__: Sequence[str] = (
+        "token",
+        "intents",
+        "setup",
+        "shard_count",
+        "shard_ids",
+        "workers",
+        "max_concurrency",
+        "stats_interval",
+        "check_interval",
+        "options",
+        "identify_limiter",
+        "_handles",
+        "_shard_map",
+        "_context",
+        "_executor",
+        "_closing",
+        "_grants",
+    )
+
+    def __init__(
+        self,
+        token: str,
+        intents: Any,
+        setup: SetupT | None = None,
+        shard_count: int | Literal["auto"] = "auto",
+        shard_ids: Sequence[int] | None = None,
+        workers: int | None = None,
+        max_concurrency: int | None = None,
+        stats_interval: float = 5.0,
+        check_interval: float = 1.0,
+        **options,
+    ) -> None:
+        self.token = token
+        self.intents = intents
+        self.setup = setup
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self.stats_interval = stats_interval
+        self.check_interval = check_interval
+        self.options = options
+        self.identify_limiter: IdentifyLimiter | None = None
+
+        self._handles: dict[int, WorkerHandle] = {}
+        self._shard_map: dict[int, WorkerHandle] = {}
+        # Forking a process that already runs an event loop isn't safe
+        self._context = multiprocessing.get_context("spawn")
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._closing = False
+        # The loop only keeps weak references to tasks, a grant nobody holds can vanish mid wait
+        self._grants: set[asyncio.Task[None]] = set()
+
+    @property
+    def handles(self) -> dict[int, WorkerHandle]:
+        return self._handles
+
+    @property
+    def stats(self) -> dict[int, dict[str, Any]]:
+        # Latest numbers every worker published, keyed by shard id
+        return {shard_id: stats for handle in self._handles.values() for shard_id, stats in handle.stats.items()}
+
+    @property
+    def totals(self) -> dict[str, Any]:
+        stats = self.stats.values()
+        latencies = [shard["latency"] for shard in stats if shard["latency"]]
+
+        return {
+            "workers": sum(handle.alive for handle in self._handles.values()),
+            "restarts": sum(handle.restarts for handle in self._handles.values()),
+            "shards": len(self._shard_map),
+            "connected": sum(shard["status"] == "connected" for shard in stats),
+            "events": sum(shard["events"] for shard in stats),
+            "skipped": sum(shard["skipped"] for shard in stats),
+            "latency": sum(latencies) / len(latencies) if latencies else 0.0,
+        }
+
+    async def fetch_recommended(self) -> tuple[int, int]:
+        from zeldia.rest.rest import RESTClient
+
+        rest = RESTClient(self.token)
+        try:
+            data = await rest.get_gateway_bot()
+        finally:
+            await rest.close()
+
+        limits = data.get("session_start_limit", {})
+
+        return data["shards"], limits.get("max_concurrency", 1)
+
+    def worker_for(self, shard_id: int) -> WorkerHandle:
+        return self._shard_map[shard_id]
+
+    def reconnect(self, shard_id: int) -> bool:
+        return send(self.worker_for(shard_id).conn, ("reconnect", shard_id, None))
+
+    def change_presence(self, shard_id: int, presence: dict[str, Any]) -> bool:
+        return send(self.worker_for(shard_id).conn, ("presence", shard_id, presence))
+
+    async def start(self) -> None:
+        if self.shard_count == "auto":
+            self.shard_count, recommended = await self.fetch_recommended()
+            self.max_concurrency = self.max_concurrency or recommended
+            logger.info("Using %d shards (max_concurrency=%d)", self.shard_count, self.max_concurrency)
+
+        self.identify_limiter = IdentifyLimiter(self.max_concurrency or 1)
+
+        shard_ids = list(self.shard_ids if self.shard_ids is not None else range(self.shard_count))
+        chunks = split_shards(shard_ids, min(self.workers, len(shard_ids)))
+
+        # One blocking recv per worker pipe, plus room for the ones a restart leaves behind
+        self._executor = concurrent.futures.ThreadPoolExecutor(len(chunks) * 2, thread_name_prefix="zeldia-ipc")
+
+        for worker_id, chunk in enumerate(chunks):
+            handle = self._handles[worker_id] = WorkerHandle(worker_id, chunk)
+            self._shard_map.update(dict.fromkeys(chunk, handle))
+            self.spawn(handle)
+
+        try:
+            await self._supervise()
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def spawn(self, handle: WorkerHandle) -> None:
+        parent, child = self._context.Pipe()
+        config = WorkerConfig(
+            worker_id=handle.worker_id,
+            token=self.token,
+            intents=self.intents,
+            shard_ids=handle.shard_ids,
+            shard_count=self.shard_count,
+            setup=self.setup,
+            stats_interval=self.stats_interval,
+            options=self.options,
+        )
+
+        handle.process = self._context.Process(
+            target=run_worker,
+            args=(config, child),
+            name=f"zeldia-worker-{handle.worker_id}",
+            daemon=True,
+        )
+        handle.process.start()
+        # Only the child holds its end now, so its death shows up as EOF on ours
+        child.close()
+
+        handle.conn = parent
+        handle._listener = asyncio.ensure_future(self._listen(handle, parent))
+
+    async def _supervise(self) -> None:
+        while not self._closing:
+            await asyncio.sleep(self.check_interval)
+
+            for handle in self._handles.values():
+                if self._closing or handle.alive:
+                    continue
+
+                logger.warning(
+                    "Worker %d (shards %s) exited with %s, restarting",
+                    handle.worker_id,
+                    handle.shard_ids,
+                    handle.process.exitcode,
+                )
+                handle.restarts += 1
+                handle.stats.clear()
+                self.spawn(handle)
+
+    async def _listen(self, handle: WorkerHandle, conn: Connection) -> None:
+        while (message := await receive(conn, self._executor)) is not None:
+            kind, shard_id, payload = message
+
+            if kind == "identify":
+                grant = asyncio.ensure_future(self._grant_identify(conn, shard_id))
+                self._grants.add(grant)
+                grant.add_done_callback(self._grants.discard)
+            elif kind == "stats":
+                handle.stats.update(payload)
+
+        conn.close()
+
+    async def _grant_identify(self, conn: Connection, shard_id: int) -> None:
+        await self.identify_limiter.acquire(shard_id)
+        send(conn, ("identify_ok", shard_id, None))
+
+    async def close(self, timeout: float = 5.0) -> None:
+        self._closing = True
+
+        for grant in self._grants:
+            grant.cancel()
+
+        for handle in self._handles.values():
+            if handle.alive:
+                send(handle.conn, ("stop", None, None))
+
+        loop = asyncio.get_running_loop()
+        for handle in self._handles.values():
+            if handle.process is None:
+                continue
+
+            await loop.run_in_executor(None, handle.process.join, timeout)
+            if handle.process.is_alive():
+                handle.process.terminate()
+
+    def run(self) -> None:
+        async def runner() -> None:
+            try:
+                await self.start()
+            finally:
+                await self.close()
+
+        try:
+            asyncio.run(runner())
+        except KeyboardInterrupt:
+            pass
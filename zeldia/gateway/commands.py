@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import time
+
+from typing import Any, Awaitable, Callable, Dict, Sequence
+
+from zeldia.enums.opcodes import OPCodes
+from zeldia.gateway.runner import LatencyHistogram
+
+
+logger = logging.getLogger(__name__)
+
+SendT = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Session handshakes jump ahead of whatever else is waiting
+URGENT_OPCODES: frozenset[int] = frozenset({OPCodes.IDENTIFY, OPCodes.RESUME})
+# Only the latest of these matters, a queued one is replaced instead of sent twice
+COALESCED_OPCODES: frozenset[int] = frozenset({OPCodes.PRESENCE_UPDATE})
+
+
+class Command:
+
+    __slots__: Sequence[str] = ("payload", "futures", "queued_at")
+
+    def __init__(self, payload: dict[str, Any], future: asyncio.Future[None]) -> None:
+        self.payload = payload
+        self.futures = [future]
+        self.queued_at = time.monotonic()
+
+
+def _resolve(command: Command, error: Exception | None = None) -> None:
+    for future in command.futures:
+        if future.done():
+            continue
+
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+
+class CommandQueue:
+    # Everything a connection sends goes through here. Discord closes with 4008
+    # after 120 sends in 60 seconds, heartbeats included. Heartbeats skip the
+    # queue and may use the whole window, every other command is held to
+    # `limit - heartbeat_reserve`, so there's always room left for a beat.
+    # Until the session is ready only IDENTIFY and RESUME go out, anything else
+    # sent first gets the connection closed with 4003.
+
+    __slots__: Sequence[str] = (
+        "limit",
+        "period",
+        "heartbeat_reserve",
+        "sent",
+        "heartbeats",
+        "coalesced",
+        "waits",
+        "_send",
+        "_sends",
+        "_urgent",
+        "_queue",
+        "_coalescing",
+        "_open",
+        "_wakeup",
+        "_sending",
+        "_drainer",
+    )
+
+    def __init__(
+        self,
+        send: SendT,
+        limit: int = 120,
+        period: float = 60.0,
+        heartbeat_reserve: int = 5,
+    ) -> None:
+        if heartbeat_reserve >= limit:
+            raise ValueError("The heartbeat reserve has to leave room for other commands.")
+
+        self.limit = limit
+        self.period = period
+        self.heartbeat_reserve = heartbeat_reserve
+        self.sent = 0
+        self.heartbeats = 0
+        self.coalesced = 0
+        self.waits = LatencyHistogram()
+
+        self._send = send
+        self._sends: collections.deque[float] = collections.deque()
+        self._urgent: collections.deque[Command] = collections.deque()
+        self._queue: collections.deque[Command] = collections.deque()
+        self._coalescing: dict[int, Command] = {}
+        self._open = False
+        # Made on first use, before 3.10 an Event binds to whatever loop is current
+        # when it's created and gateways are built before the loop runs
+        self._wakeup: asyncio.Event | None = None
+        self._sending: Command | None = None
+        self._drainer: asyncio.Task[None] | None = None
+
+    def __repr__(self) -> str:
+        return f"CommandQueue(depth={self.depth}, remaining={self.remaining}, sent={self.sent})"
+
+    @property
+    def depth(self) -> int:
+        return len(self._urgent) + len(self._queue)
+
+    @property
+    def remaining(self) -> int:
+        # Sends left in the current window for regular commands
+        return max(0, self.limit - self.heartbeat_reserve - self._in_window(time.monotonic()))
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    @property
+    def _event(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+
+        return self._wakeup
+
+    def _in_window(self, now: float) -> int:
+        while self._sends and now - self._sends[0] >= self.period:
+            self._sends.popleft()
+
+        return len(self._sends)
+
+    def reset(self) -> None:
+        # A new connection starts with a fresh window
+        self._sends.clear()
+
+    def open(self) -> None:
+        # The session is ready, whatever was queued meanwhile goes out now
+        self._open = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def pause(self) -> None:
+        # Between connections commands wait instead of failing on a dead socket
+        self._open = False
+
+    async def heartbeat(self, payload: dict[str, Any]) -> None:
+        self._sends.append(time.monotonic())
+        self.heartbeats += 1
+        await self._send(payload)
+
+    async def submit(self, payload: dict[str, Any]) -> None:
+        # Resolves once the command is on the wire
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        op = payload.get("op")
+
+        command = self._coalescing.get(op)
+        if command is not None:
+            command.payload = payload
+            command.futures.append(future)
+            self.coalesced += 1
+        else:
+            command = Command(payload, future)
+            if op in COALESCED_OPCODES:
+                self._coalescing[op] = command
+
+            (self._urgent if op in URGENT_OPCODES else self._queue).append(command)
+
+        self._event.set()
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.ensure_future(self._drain())
+
+        await future
+
+    async def _drain(self) -> None:
+        while self._urgent or self._queue:
+            if not self._urgent and not self._open:
+                self._event.clear()
+                await self._event.wait()
+                continue
+
+            now = time.monotonic()
+            if self._in_window(now) >= self.limit - self.heartbeat_reserve:
+                delay = self.period - (now - self._sends[0])
+                logger.debug("Gateway send limit reached with %d queued, waiting %.2fs", self.depth, delay)
+                await asyncio.sleep(delay)
+                continue
+
+            command = (self._urgent or self._queue).popleft()
+            op = command.payload.get("op")
+            if self._coalescing.get(op) is command:
+                del self._coalescing[op]
+
+            self._sends.append(now)
+            self.sent += 1
+            self.waits.record(now - command.queued_at)
+
+            self._sending = command
+            try:
+                await self._send(command.payload)
+            except Exception as error:
+                _resolve(command, error)
+            else:
+                _resolve(command)
+            finally:
+                # Only still pending when the drainer was cancelled mid write
+                for future in command.futures:
+                    if not future.done():
+                        future.cancel()
+
+                self._sending = None
+
+    def cancel_all(self, error: Exception) -> None:
+        # The command being written when the drainer is cancelled has left the
+        # queues already, its callers are failed here too
+        pending = (*self._urgent, *self._queue)
+        if self._sending is not None:
+            pending = (self._sending, *pending)
+
+        for command in pending:
+            _resolve(command, error)
+
+        if self._drainer is not None:
+            self._drainer.cancel()
+            self._drainer = None
+
+        self._sending = None
+        self._urgent.clear()
+        self._queue.clear()
+        self._coalescing.clear()
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import abc
+import attrs
+import zlib
+
+from typing import Sequence
+
+ZLIB_SUFFIX = b"\x00\x00\xff\xff"
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class TransportStats:
+    messages: int = 0
+    frames: int = 0
+    bytes_received: int = 0
+    bytes_decompressed: int = 0
+    decompress_time: float = 0.0
+    decode_time: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_decompressed / self.bytes_received if self.bytes_received else 1.0
+
+    @property
+    def bytes_per_message(self) -> float:
+        return self.bytes_received / self.messages if self.messages else 0.0
+
+    @property
+    def cpu_per_message(self) -> float:
+        # Seconds spent decompressing and decoding, averaged per gateway message
+        return (self.decompress_time + self.decode_time) / self.messages if self.messages else 0.0
+
+    def reset(self) -> None:
+        self.messages = self.frames = self.bytes_received = self.bytes_decompressed = 0
+        self.decompress_time = self.decode_time = 0.0
+
+
+class DecompressorTrait(abc.ABC):
+    name: str
+
+    @abc.abstractmethod
+    def feed(self, data: bytes) -> bytes | None:
+        # Returns a complete payload or None while a message is still incomplete
+        ...
+
+    @abc.abstractmethod
+    def reset(self) -> None:
+        ...
+
+
+class ZlibStreamDecompressor(DecompressorTrait):
+
+    __slots__: Sequence[str] = ("_buffer", "_size", "_decompressor")
+
+    name = "zlib-stream"
+
+    def __init__(self, capacity: int = 64 * 1024) -> None:
+        # Emptying a bytearray frees its memory, so fragments are written at an
+        # offset into a preallocated buffer instead and it's never shrunk.
+        self._buffer = bytearray(capacity)
+        self._size = 0
+        self._decompressor = zlib.decompressobj()
+
+    def feed(self, data: bytes) -> bytes | None:
+        # The common case is a whole message in one frame, that goes straight to zlib
+        if not self._size and data[-4:] == ZLIB_SUFFIX:
+            return self._decompressor.decompress(data)
+
+        end = self._size + len(data)
+        if end > len(self._buffer):
+            self._buffer.extend(bytes(max(end - len(self._buffer), len(self._buffer))))
+
+        self._buffer[self._size : end] = data
+        self._size = end
+
+        if self._buffer[end - 4 : end] != ZLIB_SUFFIX:
+            return None
+
+        self._size = 0
+        with memoryview(self._buffer) as view:
+            return self._decompressor.decompress(view[:end])
+
+    def reset(self) -> None:
+        # The zlib context lives as long as the connection, a new one needs a new context
+        self._size = 0
+        self._decompressor = zlib.decompressobj()
+
+
+class ZstdStreamDecompressor(DecompressorTrait):
+
+    __slots__: Sequence[str] = ("_zstandard", "_decompressor")
+
+    name = "zstd-stream"
+
+    def __init__(self) -> None:
+        import zstandard
+
+        self._zstandard = zstandard
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    def feed(self, data: bytes) -> bytes | None:
+        # Every websocket message is flushed on its own, no suffix to look for
+        return self._decompressor.decompress(data) or None
+
+    def reset(self) -> None:
+        self._decompressor = self._zstandard.ZstdDecompressor().decompressobj()
+
+
+DECOMPRESSORS: dict[str, type[DecompressorTrait]] = {
+    ZlibStreamDecompressor.name: ZlibStreamDecompressor,
+    ZstdStreamDecompressor.name: ZstdStreamDecompressor,
+}
+
+
+def get_decompressor(compress: bool | str | None) -> DecompressorTrait | None:
+    if not compress:
+        return None
+
+    if compress is True:
+        return ZlibStreamDecompressor()
+
+    try:
+        return DECOMPRESSORS[compress]()
+    except KeyError:
+        raise ValueError(f"Unknown compression {compress!r}, expected one of {', '.join(DECOMPRESSORS)}.") from None
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import struct
+import zlib
+
+from typing import Any
+
+# Erlang external term format, only the subset the gateway sends and accepts.
+# https://www.erlang.org/doc/apps/erts/erl_ext_dist.html
+
+FORMAT_VERSION = 131
+
+NEW_FLOAT_EXT = 70
+COMPRESSED = 80
+SMALL_INTEGER_EXT = 97
+INTEGER_EXT = 98
+FLOAT_EXT = 99
+ATOM_EXT = 100
+SMALL_TUPLE_EXT = 104
+LARGE_TUPLE_EXT = 105
+NIL_EXT = 106
+STRING_EXT = 107
+LIST_EXT = 108
+BINARY_EXT = 109
+SMALL_BIG_EXT = 110
+LARGE_BIG_EXT = 111
+SMALL_ATOM_EXT = 115
+MAP_EXT = 116
+ATOM_UTF8_EXT = 118
+SMALL_ATOM_UTF8_EXT = 119
+
+ATOMS: dict[str, Any] = {"nil": None, "true": True, "false": False}
+
+_unpack_u16 = struct.Struct(">H").unpack_from
+_unpack_u32 = struct.Struct(">I").unpack_from
+_unpack_i32 = struct.Struct(">i").unpack_from
+_unpack_double = struct.Struct(">d").unpack_from
+
+_pack_i32 = struct.Struct(">Bi").pack
+_pack_u32 = struct.Struct(">BI").pack
+_pack_double = struct.Struct(">Bd").pack
+
+
+class ETFDecodeError(ValueError):
+    ...
+
+
+def _decode_term(data: bytes, offset: int) -> tuple[Any, int]:
+    # Ordered by how often each tag shows up in gateway traffic
+    tag = data[offset]
+    offset += 1
+
+    if tag == BINARY_EXT:
+        end = offset + 4 + _unpack_u32(data, offset)[0]
+        return data[offset + 4 : end].decode("UTF-8"), end
+
+    if tag == SMALL_INTEGER_EXT:
+        return data[offset], offset + 1
+
+    if tag == MAP_EXT:
+        (arity,) = _unpack_u32(data, offset)
+        offset += 4
+        result = {}
+
+        for _ in range(arity):
+            key, offset = _decode_term(data, offset)
+            result[key], offset = _decode_term(data, offset)
+
+        return result, offset
+
+    if tag == SMALL_ATOM_UTF8_EXT or tag == SMALL_ATOM_EXT:
+        end = offset + 1 + data[offset]
+        return _atom(data[offset + 1 : end]), end
+
+    if tag == ATOM_UTF8_EXT or tag == ATOM_EXT:
+        end = offset + 2 + _unpack_u16(data, offset)[0]
+        return _atom(data[offset + 2 : end]), end
+
+    if tag == SMALL_BIG_EXT or tag == LARGE_BIG_EXT:
+        # Snowflakes, which is why they come out as plain ints without any parsing
+        if tag == SMALL_BIG_EXT:
+            length = data[offset]
+            offset += 1
+        else:
+            (length,) = _unpack_u32(data, offset)
+            offset += 4
+
+        sign = data[offset]
+        end = offset + 1 + length
+        value = int.from_bytes(data[offset + 1 : end], "little")
+        return -value if sign else value, end
+
+    if tag == LIST_EXT:
+        (length,) = _unpack_u32(data, offset)
+        offset += 4
+        result = []
+
+        for _ in range(length):
+            item, offset = _decode_term(data, offset)
+            result.append(item)
+
+        # Proper lists end in NIL, anything else is an improper tail we drop
+        _, offset = _decode_term(data, offset)
+        return result, offset
+
+    if tag == NIL_EXT:
+        return [], offset
+
+    if tag == INTEGER_EXT:
+        return _unpack_i32(data, offset)[0], offset + 4
+
+    if tag == NEW_FLOAT_EXT:
+        return _unpack_double(data, offset)[0], offset + 8
+
+    if tag == STRING_EXT:
+        # Erlang "strings" are byte lists, erlpack hands them out as str too
+        end = offset + 2 + _unpack_u16(data, offset)[0]
+        return data[offset + 2 : end].decode("UTF-8"), end
+
+    if tag == SMALL_TUPLE_EXT or tag == LARGE_TUPLE_EXT:
+        if tag == SMALL_TUPLE_EXT:
+            arity = data[offset]
+            offset += 1
+        else:
+            (arity,) = _unpack_u32(data, offset)
+            offset += 4
+
+        items = []
+        for _ in range(arity):
+            item, offset = _decode_term(data, offset)
+            items.append(item)
+
+        return tuple(items), offset
+
+    if tag == FLOAT_EXT:
+        return float(data[offset : offset + 31].rstrip(b"\x00")), offset + 31
+
+    raise ETFDecodeError(f"Unsupported ETF tag {tag} at offset {offset - 1}.")
+
+
+def _atom(name: bytes) -> Any:
+    name = name.decode("UTF-8")
+    return ATOMS.get(name, name)
+
+
+def decode(data: bytes | bytearray | memoryview) -> Any:
+    data = bytes(data)
+
+    # A version byte alone is as broken as no header, there's no term to read
+    if len(data) < 2 or data[0] != FORMAT_VERSION:
+        raise ETFDecodeError("Missing ETF version header.")
+
+    if data[1] == COMPRESSED:
+        try:
+            data = bytes((FORMAT_VERSION,)) + zlib.decompress(data[6:])
+        except zlib.error as error:
+            raise ETFDecodeError("Corrupt compressed ETF payload.") from error
+
+    try:
+        value, _ = _decode_term(data, 1)
+    except (IndexError, struct.error) as error:
+        raise ETFDecodeError("Truncated ETF payload.") from error
+
+    return value
+
+
+def _encode_term(obj: Any, out: bytearray) -> None:
+    # bool before int, it's a subclass
+    if obj is None:
+        out += b"\x77\x03nil"
+    elif obj is True:
+        out += b"\x77\x04true"
+    elif obj is False:
+        out += b"\x77\x05false"
+    elif isinstance(obj, str):
+        encoded = obj.encode("UTF-8")
+        out += _pack_u32(BINARY_EXT, len(encoded))
+        out += encoded
+    elif isinstance(obj, int):
+        if 0 <= obj <= 255:
+            out += bytes((SMALL_INTEGER_EXT, obj))
+        elif -(2**31) <= obj < 2**31:
+            out += _pack_i32(INTEGER_EXT, obj)
+        else:
+            magnitude = abs(obj)
+            digits = magnitude.to_bytes((magnitude.bit_length() + 7) // 8, "little")
+            out += bytes((SMALL_BIG_EXT, len(digits), obj < 0))
+            out += digits
+    elif isinstance(obj, float):
+        out += _pack_double(NEW_FLOAT_EXT, obj)
+    elif isinstance(obj, dict):
+        out += _pack_u32(MAP_EXT, len(obj))
+        for key, value in obj.items():
+            _encode_term(key, out)
+            _encode_term(value, out)
+    elif isinstance(obj, (list, tuple)):
+        if not obj:
+            out.append(NIL_EXT)
+            return
+
+        out += _pack_u32(LIST_EXT, len(obj))
+        for item in obj:
+            _encode_term(item, out)
+        out.append(NIL_EXT)
+    else:
+        raise TypeError(f"Can't encode {type(obj).__name__} as ETF.")
+
+
+def encode(obj: Any) -> bytes:
+    out = bytearray((FORMAT_VERSION,))
+    _encode_term(obj, out)
+
+    return bytes(out)
@@ -2,83 +2,237 @@ from __future__ import annotations
 
 import aiohttp
 import asyncio
-import json
-import time
+import contextvars
+import logging
+import random
+import re
 import sys
-import zlib
+import time
 
-from typing import Any, Sequence, Callable, Awaitable, TYPE_CHECKING
+from typing import Any, Sequence, Callable, Awaitable, Iterable, TYPE_CHECKING
 
-from zeldia.gateway.runner import Runner
+from zeldia.codec import CodecTrait, get_codec
+from zeldia.gateway import etf
+from zeldia.gateway.compression import TransportStats, get_decompressor
+from zeldia.gateway.members import MemberChunkStream, MemberRequests
+from zeldia.gateway.commands import CommandQueue
+from zeldia.gateway.runner import LatencyHistogram, Runner, RunnerTrait
+from zeldia.enums.gateway_status import GatewayStatus
 from zeldia.enums.opcodes import OPCodes
+from zeldia.exceptions import GatewayClosed
 from zeldia.flags.intents import Intents
 from zeldia.converters import payload_to_message
+from zeldia.middleware import DispatchContext
+from zeldia.models.lazy import LazyMessage
+from zeldia.rest.retry import RetryPolicy
+from zeldia.rest.transport import HTTPTransport
 
 if TYPE_CHECKING:
+    from zeldia.gateway.recorder import FrameRecorder
+    from zeldia.middleware import MiddlewarePipeline
+    from zeldia.gateway.schemas import SchemaDecoder
+    from zeldia.gateway.shard import IdentifyLimiter
     from zeldia.models.message import Message
 
 
+logger = logging.getLogger(__name__)
+
+current_shard: contextvars.ContextVar[int | None] = contextvars.ContextVar("current_shard", default=None)
+
+DispatchHookT = Callable[[str, "dict[str, Any] | None", Any], None]
+
+
 GATEWAY_URL_MAP: dict[bool, str] = {
-    True: "wss://gateway.discord.gg/?v=10&encoding=json&compress=true",
+    True: "wss://gateway.discord.gg/?v=10&encoding=json&compress=zlib-stream",
     False: "wss://gateway.discord.gg/?v=10&encoding=json",
 }
 
+# Always handled, the gateway needs them to keep track of its own session
+SESSION_EVENTS: frozenset[str] = frozenset({"READY", "RESUMED"})
+
+# Discord sends dispatches as {"t":..,"s":..,"op":0,"d":..}, anchoring at the start
+# means nothing inside `d` can match. Any other layout is simply decoded in full.
+PRESCAN_PATTERN = rb'\{"t": ?"([A-Z_]+)", ?"s": ?(\d+)'
+PRESCAN: dict[type, re.Pattern[Any]] = {
+    bytes: re.compile(PRESCAN_PATTERN),
+    str: re.compile(PRESCAN_PATTERN.decode()),
+}
+
+# Closing with one of these means something is wrong on our side, reconnecting won't help
+FATAL_CLOSE_CODES: frozenset[int] = frozenset({4004, 4010, 4011, 4012, 4013, 4014})
+
+# The connection can be re-established but the session is gone, identify again
+SESSION_CLOSE_CODES: frozenset[int] = frozenset({1000, 1001, 4007, 4009})
+
+# Discord wants a random wait in this range (seconds) before identifying again after op 9
+INVALID_SESSION_DELAY: tuple[float, float] = (1.0, 5.0)
+
 
 class Gateway:
 
     __slots__: Sequence[str] = (
         "token",
         "intents",
-        "session",
+        "transport",
         "compress",
+        "lazy_models",
+        "codec",
+        "encoding",
         "emitter",
+        "shard_id",
+        "shard_count",
+        "identify_limiter",
+        "status",
+        "gateway_url",
+        "dispatched",
+        "skipped",
+        "listening",
+        "middleware",
+        "recorder",
+        "commands",
+        "member_requests",
+        "session_id",
+        "resume_gateway_url",
+        "sequence",
+        "reconnect_policy",
+        "_reconnects",
+        "_close_code",
+        "_heartbeat",
+        "_identify_task",
+        "_invalid_session_delay",
+        "_hooks",
+        "_global_hooks",
+        "_schemas",
         "_socket",
         "_interval",
         "_loop",
+        "latency_histogram",
         "_runner",
-        "_latency",
-        "_buffer",
+        "_runner_factory",
+        "transport_stats",
         "_decompressor",
     )
 
     _socket: aiohttp.ClientWebSocketResponse
     _interval: float | None
-    _latency: float
 
     def __init__(
         self,
         token: str,
         intents: Intents,
         emitter: Callable[[str, Any], Awaitable[None]],
-        session: aiohttp.ClientSession | None = None,
-        compress: bool | None = None,
+        session: aiohttp.ClientSession | HTTPTransport | None = None,
+        compress: bool | str | None = None,
+        lazy_models: bool = False,
+        codec: CodecTrait | str | None = None,
+        typed_decoding: bool = False,
+        encoding: str = "json",
+        listening: Callable[[str], bool] | None = None,
+        middleware: MiddlewarePipeline | None = None,
+        recorder: FrameRecorder | None = None,
+        command_queue: CommandQueue | None = None,
+        shard_id: int | None = None,
+        shard_count: int | None = None,
+        identify_limiter: IdentifyLimiter | None = None,
+        gateway_url: str | None = None,
+        reconnect_policy: RetryPolicy | None = None,
         **options,
     ) -> None:
         self.token = token
         self.intents = intents
-        self.session = aiohttp.ClientSession if not session else session
+        self.transport = session if isinstance(session, HTTPTransport) else HTTPTransport(session=session)
         self.compress = compress if compress else False
+        self.lazy_models = lazy_models
+        self.codec = get_codec(codec)
+        self.encoding = encoding
         self.emitter = emitter
+        self.shard_id = shard_id
+        self.shard_count = shard_count
+        self.identify_limiter = identify_limiter
+        self.status = GatewayStatus.DISCONNECTED
+        self.gateway_url = gateway_url
+        self.dispatched = 0
+        self.skipped = 0
+        self.listening = listening
+        self.middleware = middleware
+        self.recorder = recorder
+        self.commands = CommandQueue(self._send_raw) if command_queue is None else command_queue
+        self.member_requests = MemberRequests(self.send)
+        self.session_id: str | None = None
+        self.resume_gateway_url: str | None = None
+        self.sequence: int | None = None
+        self.reconnect_policy = reconnect_policy or RetryPolicy(base_delay=1.0, max_delay=60.0)
+        self._reconnects = 0
+        self._close_code: int | None = None
+        self._heartbeat: asyncio.Task[None] | None = None
+        self._identify_task: asyncio.Task[None] | None = None
+        self._invalid_session_delay = INVALID_SESSION_DELAY
+        self._hooks: dict[str, tuple[DispatchHookT, ...]] = {}
+        self._global_hooks: tuple[DispatchHookT, ...] = ()
+        self._schemas: SchemaDecoder | None = None
+
+        if encoding not in ("json", "etf"):
+            raise ValueError(f"Unknown gateway encoding {encoding!r}, expected 'json' or 'etf'.")
+
+        if typed_decoding and encoding != "json":
+            raise ValueError("Typed decoding needs the JSON gateway encoding.")
+
+        if typed_decoding:
+            from zeldia.gateway import schemas
+
+            self._schemas = schemas.SchemaDecoder()
 
         self._socket = None
         self._interval = None
         self._loop = options.pop("loop", asyncio.get_event_loop())
-        self._runner = Runner()
-        self._latency = 0
-        self._buffer = bytearray()
-        self._decompressor = zlib.decompressobj()
+        self._runner: RunnerTrait = Runner()
+        self._runner_factory: Callable[[], RunnerTrait] = Runner
+        self.latency_histogram = LatencyHistogram()
+        self.transport_stats = TransportStats()
+        self._decompressor = get_decompressor(self.compress)
 
     @property
     def latency(self) -> float:
-        return self._latency
+        return self.latency_histogram.last
+
+    def add_dispatch_hook(self, hook: DispatchHookT, events: Iterable[str] | None = None) -> None:
+        # Hooks are resolved per event name up front, dispatching is a single dict lookup
+        if events is None:
+            self._global_hooks += (hook,)
+            self._hooks = {event: hooks + (hook,) for event, hooks in self._hooks.items()}
+            return
+
+        for event in events:
+            self._hooks[event] = self._hooks.get(event, self._global_hooks) + (hook,)
+
+    def hooks_for(self, event: str) -> tuple[DispatchHookT, ...]:
+        return self._hooks.get(event, self._global_hooks)
+
+    def wants(self, event: str) -> bool:
+        # Without a listener check every event is wanted, as for a bare Gateway
+        if self.listening is None or event in SESSION_EVENTS:
+            return True
+
+        if event == "GUILD_MEMBERS_CHUNK" and self.member_requests:
+            return True
+
+        return bool(self.hooks_for(event)) or self.listening(event)
+
+    def prescan(self, raw: bytes | str) -> tuple[str, int] | None:
+        match = PRESCAN[type(raw)].match(raw)
+        if match is None:
+            return None
+
+        event, sequence = match.groups()
+        return event if isinstance(event, str) else event.decode(), int(sequence)
 
     @property
     def identify_payload(self) -> dict[str, Any]:
-        return {
+        payload = {
             "op": OPCodes.IDENTIFY,
             "d": {
                 "token": self.token,
-                "intents": self.intents.value,
+                "intents": self.intents.value if isinstance(self.intents, Intents) else int(self.intents or 0),
                 "properties": {
                     "os": sys.platform,
                     "browser": "zeldia",
@@ -87,48 +241,331 @@ class Gateway:
             },
         }
 
+        if self.shard_id is not None:
+            payload["d"]["shard"] = [self.shard_id, self.shard_count]
+
+        return payload
+
+    @property
+    def can_resume(self) -> bool:
+        return self.session_id is not None and self.sequence is not None
+
+    @property
+    def url(self) -> str:
+        url = self.gateway_url or GATEWAY_URL_MAP[False]
+
+        if self.encoding != "json":
+            url = url.replace("encoding=json", f"encoding={self.encoding}")
+
+        if self._decompressor is not None and "compress=" not in url:
+            url = f"{url}&compress={self._decompressor.name}"
+
+        if self.can_resume and self.resume_gateway_url:
+            # READY only hands out the host, the query string stays the same
+            return f"{self.resume_gateway_url.rstrip('/')}/?{url.partition('?')[2]}"
+
+        return url
+
     async def connect(self):
-        async with self.session.ws_connect(GATEWAY_URL_MAP[self.compress]) as ws:
-            self._socket = ws
-            async for msg in self._socket:
-                if msg.type == aiohttp.WSMsgType.TEXT:
-                    await self.handle_payload(
-                        msg.data if self.compress else json.loads(msg.data)
-                    )
+        # Handlers awaited from this task can tell which shard the event came from
+        current_shard.set(self.shard_id)
 
-    async def start_heartbeating(self, payload: dict[str, Any]):
-        await self._socket.send_json(self.identify_payload)
+        while self.status is not GatewayStatus.CLOSED:
+            self.status = GatewayStatus.CONNECTING
+            self._close_code = None
+            code = None
+
+            try:
+                # Compression contexts don't survive the connection they were made for
+                if self._decompressor is not None:
+                    self._decompressor.reset()
+
+                async with self.transport.websocket_session.ws_connect(self.url) as ws:
+                    self._socket = ws
+                    self.commands.reset()
+                    recorder = self.recorder
+                    if recorder is not None:
+                        recorder.connection(self.shard_id, url=self.url, encoding=self.encoding, compress=self.compress)
+
+                    async for msg in self._socket:
+                        if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                            if recorder is not None:
+                                recorder.record(self.shard_id, msg.data)
+                            await self.handle_payload(msg.data)
+
+                # The close frame Discord echoes back isn't what decides, the code we sent is
+                code = self._close_code or ws.close_code
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                logger.warning("Shard %s lost its connection: %r", self.shard_id, error)
+            finally:
+                self.commands.pause()
+                self.stop_heartbeating()
+                self.cancel_identify()
+
+            if self.status is GatewayStatus.CLOSED:
+                break
+
+            self.status = GatewayStatus.DISCONNECTED
+            self.handle_close(code)
+
+            delay = self.reconnect_policy.backoff(self._reconnects) if self._reconnects else 0
+            self._reconnects += 1
+
+            logger.info(
+                "Shard %s closed with %s, %s in %.2fs",
+                self.shard_id,
+                code,
+                "resuming" if self.can_resume else "reconnecting",
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+    def handle_close(self, code: int | None) -> None:
+        if code in FATAL_CLOSE_CODES:
+            self.status = GatewayStatus.CLOSED
+            raise GatewayClosed(f"Gateway closed the connection with {code}, not reconnecting.")
 
+        if code in SESSION_CLOSE_CODES:
+            self.invalidate_session()
+
+    def invalidate_session(self) -> None:
+        self.session_id = None
+        self.resume_gateway_url = None
+        self.sequence = None
+
+    async def reconnect(self) -> None:
+        # Anything but 1000/1001 keeps the session alive on Discord's side, the
+        # connect loop picks it up again and resumes.
+        if self._socket is not None and not self._socket.closed:
+            self._close_code = 4000
+            await self._socket.close(code=4000)
+
+    async def identify(self) -> None:
+        self.status = GatewayStatus.IDENTIFYING
+
+        if self.identify_limiter is not None:
+            await self.identify_limiter.acquire(self.shard_id or 0)
+
+        await self.send(self.identify_payload)
+
+    async def resume(self) -> None:
+        self.status = GatewayStatus.RESUMING
+
+        await self.send(
+            {
+                "op": OPCodes.RESUME,
+                "d": {
+                    "token": self.token,
+                    "session_id": self.session_id,
+                    "seq": self.sequence,
+                },
+            }
+        )
+
+    async def send(self, payload: dict[str, Any]) -> None:
+        # Heartbeats never wait behind queued commands, a late one costs the session
+        if payload.get("op") == OPCodes.HEARTBEAT:
+            await self.commands.heartbeat(payload)
+        else:
+            await self.commands.submit(payload)
+
+    async def _send_raw(self, payload: dict[str, Any]) -> None:
+        if self.encoding == "etf":
+            await self._socket.send_bytes(etf.encode(payload))
+        else:
+            await self._socket.send_str(self.codec.dumps(payload))
+
+    async def update_presence(self, presence: dict[str, Any]) -> None:
+        await self.send({"op": OPCodes.PRESENCE_UPDATE, "d": presence})
+
+    def request_guild_members(
+        self,
+        guild_id: int,
+        *,
+        query: str | None = None,
+        user_ids: Iterable[int] | None = None,
+        limit: int = 0,
+        presences: bool = False,
+        timeout: float | None = 10.0,
+    ) -> MemberChunkStream:
+        return self.member_requests.create(
+            guild_id, query=query, user_ids=user_ids, limit=limit, presences=presences, timeout=timeout
+        )
+
+    async def start_heartbeating(self, payload: dict[str, Any]):
         self._interval = payload["d"]["heartbeat_interval"] / 1000
-        self._loop.create_task(self._runner.start(self))
+        self._runner = self._runner_factory()
+        self._heartbeat = self._loop.create_task(self._runner.start(self))
+
+        # Identifying can wait on the identify limiter far longer than a heartbeat
+        # interval, so it runs on the side while the read loop and beats carry on
+        self.cancel_identify()
+        self._identify_task = self._loop.create_task(self._handshake())
+
+    def stop_heartbeating(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def handle_invalid_session(self, resumable: bool) -> None:
+        # Nothing but the handshake may go out until READY or RESUMED again
+        self.commands.pause()
+
+        if resumable and self.can_resume:
+            await self.resume()
+            return
+
+        # The wait runs in its own task, the read loop keeps answering heartbeats meanwhile
+        self.invalidate_session()
+        self.cancel_identify()
+        delay = random.uniform(*self._invalid_session_delay)
+        self._identify_task = self._loop.create_task(self._handshake(delay))
+
+    async def _handshake(self, delay: float = 0.0) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+
+        try:
+            if self.can_resume:
+                await self.resume()
+            else:
+                await self.identify()
+        except Exception as error:
+            # The connection went away in the meantime, the connect loop starts over anyway
+            logger.warning("Shard %s couldn't identify or resume: %r", self.shard_id, error)
 
-    def convert_to_model(self, event_name: str, payload: dict[str, Any]) -> "Message":
+    def cancel_identify(self) -> None:
+        if self._identify_task is not None:
+            self._identify_task.cancel()
+            self._identify_task = None
+
+    def convert_to_model(self, event_name: str, payload: dict[str, Any]) -> "Message" | LazyMessage:
         if event_name == "MESSAGE_CREATE":
-            return payload_to_message(payload)
+            return LazyMessage(payload) if self.lazy_models else payload_to_message(payload)
 
     async def handle_payload(self, raw: str | bytes):
-        if isinstance(raw, bytes):
-            self._buffer.extend(raw)
-            if len(raw) < 4 or raw[-4:] != b"\x00\x00\xff\xff":
+        stats = self.transport_stats
+        stats.frames += 1
+        stats.bytes_received += len(raw)
+
+        if isinstance(raw, bytes) and self._decompressor is not None:
+            started = time.perf_counter()
+            raw = self._decompressor.feed(raw)
+            stats.decompress_time += time.perf_counter() - started
+
+            if raw is None:
                 return
 
-            raw = self._decompressor.decompress(self._buffer).decode("UTF-8")
-            self._buffer = bytearray()
+        stats.messages += 1
+        stats.bytes_decompressed += len(raw)
+        started = time.perf_counter()
+
+        if self.listening is not None and self.encoding == "json":
+            # Events nobody listens to are dropped from their first bytes, the
+            # frame is never decoded at all.
+            scanned = self.prescan(raw)
+
+            if scanned is not None and not self.wants(scanned[0]):
+                self.sequence = scanned[1]
+                self.skipped += 1
+                stats.decode_time += time.perf_counter() - started
+                return
+
+        envelope = None if self._schemas is None else self._schemas.decode_envelope(raw)
+
+        if envelope is not None:
+            stats.decode_time += time.perf_counter() - started
+
+            if envelope.op == OPCodes.DISPATCH:
+                if envelope.s is not None:
+                    self.sequence = envelope.s
+
+                await self.dispatch(envelope.t, None, envelope.d)
+                return
 
-        payload = json.loads(raw)
+            payload = {
+                "op": envelope.op,
+                "s": envelope.s,
+                "t": envelope.t,
+                "d": self._schemas.decode_generic(envelope.d),
+            }
+        elif self.encoding == "etf":
+            # Snowflakes are ETF big integers, they come out as ints already
+            payload = etf.decode(raw)
+            stats.decode_time += time.perf_counter() - started
+        else:
+            # Decompressed bytes go straight into the codec, no intermediate str
+            payload = self.codec.loads(raw)
+            stats.decode_time += time.perf_counter() - started
 
         opcode = payload.get("op")
 
         if opcode == OPCodes.HEARTBEAT_ACK:
-            self._latency = time.perf_counter() - self._runner.last_heartbeat
-            self._runner.ack()
+            self.latency_histogram.record(self._runner.ack())
+        if opcode == OPCodes.HEARTBEAT:
+            # Discord can ask for a beat at any time, it has to be answered right away
+            await self._runner.beat(self)
         if opcode == OPCodes.HELLO:
             await self.start_heartbeating(payload)
+        if opcode == OPCodes.RECONNECT:
+            await self.reconnect()
+        if opcode == OPCodes.INVALIDATE_SESSION:
+            await self.handle_invalid_session(bool(payload.get("d")))
         if opcode == OPCodes.DISPATCH:
-            event = payload.get("t")
-            data = payload.get("d")
+            # Resuming replays everything after this sequence, nothing gets lost
+            if payload.get("s") is not None:
+                self.sequence = payload["s"]
 
-            await self.emitter(event.upper(), self.convert_to_model(event, data))
+            await self.dispatch(payload.get("t"), payload.get("d"))
+
+    async def dispatch(self, event: str, data: dict[str, Any] | None, raw_data: Any | None = None) -> None:
+        if not self.wants(event):
+            self.skipped += 1
+            return
+
+        self.dispatched += 1
+
+        hooks = self.hooks_for(event)
+        chain = None if self.middleware is None else self.middleware.chain_for(event)
+        model = None
+
+        if raw_data is not None:
+            # Hot events go straight from the frame bytes into a typed struct, the
+            # generic dict is only built when something still needs it.
+            model = self._schemas.decode(event, raw_data)
+            if model is None or hooks or chain is not None:
+                data = self._schemas.decode_generic(raw_data)
+
+        if model is None:
+            model = self.convert_to_model(event, data)
+
+        if event == "READY":
+            self.session_id = data["session_id"]
+            self.resume_gateway_url = data.get("resume_gateway_url")
+        if event in ("READY", "RESUMED"):
+            self.status = GatewayStatus.CONNECTED
+            self._reconnects = 0
+            self.commands.open()
+        if event == "GUILD_MEMBERS_CHUNK" and self.member_requests:
+            self.member_requests.feed(data)
+
+        for hook in hooks:
+            hook(event, data, model)
+
+        if chain is None:
+            await self.emitter(event.upper(), model)
+        else:
+            await self.middleware.run(chain, DispatchContext(event.upper(), data, model, self.shard_id))
 
     async def close(self, *, code: int = 4000):
-        await self._socket.close(code=code)
+        self.status = GatewayStatus.CLOSED
+        self.cancel_identify()
+        self.member_requests.cancel_all(GatewayClosed("Gateway closed before all member chunks arrived."))
+        self.commands.cancel_all(GatewayClosed("Gateway closed before the command was sent."))
+
+        # Shards may share a recorder, whoever owns it closes it (ShardManager.close does)
+        if self.recorder is not None:
+            self.recorder.flush()
+
+        if self._socket is not None and not self._socket.closed:
+            await self._socket.close(code=code)
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import attrs
+import collections
+import itertools
+import weakref
+
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Sequence
+
+from zeldia.converters import payload_to_member
+from zeldia.enums.opcodes import OPCodes
+from zeldia.models.member import Member
+from zeldia.models.snowflake import Snowflake
+
+# Discord takes at most this many user ids per REQUEST_GUILD_MEMBERS
+USER_IDS_PER_REQUEST = 100
+
+SendT = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class MemberChunk:
+    guild_id: Snowflake
+    nonce: str
+    index: int
+    count: int
+    members: list[Member] = attrs.field(factory=list, repr=False)
+    not_found: list[Snowflake] = attrs.field(factory=list)
+    presences: list[dict[str, Any]] = attrs.field(factory=list, repr=False)
+
+
+class MemberChunkStream:
+    # Chunks of one member request, in arrival order. Requests for more than 100
+    # user ids are split up and every part gets its own nonce, the stream ends
+    # once all of them have delivered their last chunk. Nothing is sent, and
+    # the stream isn't registered for chunks, before it is iterated.
+
+    __slots__: Sequence[str] = (
+        "guild_id",
+        "timeout",
+        "chunks",
+        "_registry",
+        "_requests",
+        "_remaining",
+        "_queue",
+        "_ready",
+        "_started",
+        "_closed",
+        "_error",
+        "__weakref__",
+    )
+
+    def __init__(
+        self,
+        registry: MemberRequests,
+        guild_id: int,
+        requests: list[dict[str, Any]],
+        timeout: float | None = 10.0,
+    ) -> None:
+        self.guild_id = Snowflake(guild_id)
+        self.timeout = timeout
+        self.chunks = 0
+
+        self._registry = registry
+        self._requests = requests
+        # Chunks still expected per nonce, unknown until its first chunk says how many
+        self._remaining: dict[str, int | None] = dict.fromkeys(self.nonces)
+        self._queue: collections.deque[MemberChunk] = collections.deque()
+        self._ready = asyncio.Event()
+        self._started = False
+        self._closed = False
+        self._error: Exception | None = None
+
+    def __repr__(self) -> str:
+        return f"MemberChunkStream(guild_id={self.guild_id}, nonces={list(self._remaining)}, chunks={self.chunks})"
+
+    @property
+    def nonces(self) -> tuple[str, ...]:
+        return tuple(request["d"]["nonce"] for request in self._requests)
+
+    @property
+    def done(self) -> bool:
+        return self._closed
+
+    def feed(self, data: dict[str, Any]) -> bool:
+        # Returns True once the last expected chunk arrived
+        nonce = data["nonce"]
+        guild_id = data["guild_id"]
+
+        chunk = MemberChunk(
+            guild_id=Snowflake(guild_id),
+            nonce=nonce,
+            index=data.get("chunk_index", 0),
+            count=data.get("chunk_count", 1),
+            members=[payload_to_member(member, guild_id) for member in data.get("members", ())],
+            not_found=[Snowflake(user_id) for user_id in data.get("not_found", ())],
+            presences=data.get("presences", []),
+        )
+
+        remaining = self._remaining.get(nonce)
+        self._remaining[nonce] = (chunk.count if remaining is None else remaining) - 1
+        self.chunks += 1
+
+        self._queue.append(chunk)
+        self._ready.set()
+
+        if all(remaining == 0 for remaining in self._remaining.values()):
+            self.close()
+            return True
+
+        return False
+
+    def close(self, error: Exception | None = None) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+        self._error = error
+        self._ready.set()
+        self._registry.remove(self)
+
+    async def start(self, send: SendT) -> None:
+        if self._started:
+            return
+
+        self._started = True
+        self._registry.register(self)
+        for request in self._requests:
+            await send(request)
+
+    def __aiter__(self) -> AsyncIterator[MemberChunk]:
+        return self
+
+    async def __anext__(self) -> MemberChunk:
+        if not self._started:
+            await self.start(self._registry.send)
+
+        while not self._queue:
+            if self._closed:
+                if self._error is not None:
+                    raise self._error
+                raise StopAsyncIteration
+
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                # No intent, wrong shard or a reconnect in between, the chunks aren't coming
+                self.close()
+                raise
+
+        return self._queue.popleft()
+
+    async def members(self) -> AsyncIterator[Member]:
+        async for chunk in self:
+            for member in chunk.members:
+                yield member
+
+    async def collect(self) -> list[Member]:
+        return [member async for member in self.members()]
+
+    async def __aenter__(self) -> MemberChunkStream:
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        self.close()
+
+
+class MemberRequests:
+    # Every request gets its own nonce, so any number of them can be in flight on
+    # one connection and each chunk finds its way back to the right stream.
+    # Streams are held weakly, one that's dropped mid iteration unregisters
+    # itself once it's collected.
+
+    __slots__: Sequence[str] = ("send", "_streams", "_nonces")
+
+    def __init__(self, send: SendT) -> None:
+        self.send = send
+        self._streams: weakref.WeakValueDictionary[str, MemberChunkStream] = weakref.WeakValueDictionary()
+        self._nonces = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(set(self._streams.values()))
+
+    def __bool__(self) -> bool:
+        return bool(self._streams)
+
+    def create(
+        self,
+        guild_id: int,
+        *,
+        query: str | None = None,
+        user_ids: Iterable[int] | None = None,
+        limit: int = 0,
+        presences: bool = False,
+        timeout: float | None = 10.0,
+    ) -> MemberChunkStream:
+        if query is not None and user_ids is not None:
+            raise ValueError("Request members by query or by user ids, not both.")
+
+        base = {"guild_id": str(guild_id), "presences": presences}
+        if user_ids is None:
+            # An empty query with no limit asks for every member of the guild
+            parts = [{**base, "query": query or "", "limit": limit}]
+        else:
+            ids = [str(user_id) for user_id in user_ids]
+            parts = [
+                {**base, "user_ids": ids[start : start + USER_IDS_PER_REQUEST]}
+                for start in range(0, len(ids), USER_IDS_PER_REQUEST)
+            ]
+
+            if not parts:
+                raise ValueError("No user ids to request.")
+
+        requests = [{"op": OPCodes.REQUEST_GUILD_MEMBERS, "d": {**part, "nonce": self.nonce()}} for part in parts]
+        return MemberChunkStream(self, guild_id, requests, timeout)
+
+    def nonce(self) -> str:
+        return f"zeldia-{next(self._nonces)}"
+
+    def register(self, stream: MemberChunkStream) -> None:
+        for nonce in stream.nonces:
+            self._streams[nonce] = stream
+
+    def remove(self, stream: MemberChunkStream) -> None:
+        for nonce in stream.nonces:
+            self._streams.pop(nonce, None)
+
+    def feed(self, data: dict[str, Any]) -> bool:
+        # Chunks for someone else (no nonce, or one we didn't hand out) are left alone
+        stream = self._streams.get(data.get("nonce"))
+        if stream is None:
+            return False
+
+        stream.feed(data)
+        return True
+
+    def cancel_all(self, error: Exception | None = None) -> None:
+        for stream in set(self._streams.values()):
+            stream.close(error)
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import asyncio
+import attrs
+import json
+import mmap
+import os
+import struct
+import time
+
+from typing import TYPE_CHECKING, Any, Iterator, NamedTuple, Sequence
+
+from zeldia.enums.opcodes import OPCodes
+from zeldia.gateway.runner import RunnerTrait
+
+if TYPE_CHECKING:
+    from zeldia.gateway.gateway import Gateway
+
+# Layout: MAGIC, then records of a fixed header and the raw frame. CONNECT
+# records carry a small JSON blob (url, encoding, compress) since a replay has
+# to start a fresh decompression context at the same points the connection did.
+MAGIC = b"ZLDREC\x00\x01"
+
+TEXT = 0
+BINARY = 1
+CONNECT = 2
+
+NO_SHARD = 0xFFFF
+
+# monotonic ns, kind, shard id, payload length
+RECORD = struct.Struct("<QBHI")
+
+
+class RecordingError(ValueError):
+    ...
+
+
+class Frame(NamedTuple):
+    timestamp: int
+    kind: int
+    shard_id: int | None
+    data: bytes | str
+
+
+class FrameRecorder:
+    # Appends frames exactly as they came off the socket, before decompression.
+    # Writes go through a large buffer, the read loop never waits on the disk.
+
+    __slots__: Sequence[str] = ("path", "frames", "bytes_written", "_file")
+
+    def __init__(self, path: str | os.PathLike[str], buffer_size: int = 1 << 20) -> None:
+        self.path = os.fspath(path)
+        self.frames = 0
+        self.bytes_written = 0
+
+        self._file = open(self.path, "ab", buffering=buffer_size)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def __repr__(self) -> str:
+        return f"FrameRecorder(path={self.path!r}, frames={self.frames})"
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def _write(self, kind: int, shard_id: int | None, data: bytes) -> None:
+        self._file.write(RECORD.pack(time.monotonic_ns(), kind, NO_SHARD if shard_id is None else shard_id, len(data)))
+        self._file.write(data)
+        self.bytes_written += RECORD.size + len(data)
+
+    def connection(self, shard_id: int | None, **meta: Any) -> None:
+        if not self._file.closed:
+            self._write(CONNECT, shard_id, json.dumps(meta).encode())
+
+    def record(self, shard_id: int | None, data: bytes | str) -> None:
+        if self._file.closed:
+            return
+
+        if isinstance(data, str):
+            self._write(TEXT, shard_id, data.encode())
+        else:
+            self._write(BINARY, shard_id, data)
+
+        self.frames += 1
+
+    def flush(self) -> None:
+        if not self._file.closed:
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> FrameRecorder:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+
+class FrameReader:
+    # Maps the recording instead of reading it, a multi gigabyte capture costs
+    # nothing up front and pages come in as the replay reaches them.
+
+    __slots__: Sequence[str] = ("path", "_file", "_map")
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = os.fspath(path)
+        self._file = open(self.path, "rb")
+
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            self._file.close()
+            raise RecordingError(f"{self.path} is empty.") from None
+
+        if self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise RecordingError(f"{self.path} is not a gateway recording.")
+
+    def __repr__(self) -> str:
+        return f"FrameReader(path={self.path!r}, size={len(self._map)})"
+
+    def _records(self) -> Iterator[tuple[int, int, int, int, int]]:
+        view = self._map
+        offset = len(MAGIC)
+        end = len(view)
+
+        while offset + RECORD.size <= end:
+            timestamp, kind, shard_id, length = RECORD.unpack_from(view, offset)
+            offset += RECORD.size
+
+            if offset + length > end:
+                # The recorder was killed mid write, everything before is fine
+                break
+
+            yield timestamp, kind, shard_id, offset, length
+            offset += length
+
+    def __iter__(self) -> Iterator[Frame]:
+        view = self._map
+
+        for timestamp, kind, shard_id, offset, length in self._records():
+            data = view[offset : offset + length]
+            yield Frame(
+                timestamp,
+                kind,
+                None if shard_id == NO_SHARD else shard_id,
+                data.decode() if kind == TEXT else data,
+            )
+
+    @property
+    def shards(self) -> set[int | None]:
+        # Only walks the record headers, no frame is copied out of the map
+        return {
+            None if shard_id == NO_SHARD else shard_id
+            for _, kind, shard_id, _, _ in self._records()
+            if kind == CONNECT
+        }
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> FrameReader:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class ReplayStats:
+    connections: int = 0
+    frames: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    recorded: float = 0.0
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def speedup(self) -> float:
+        return self.recorded / self.elapsed if self.elapsed else 0.0
+
+
+class _ReplaySocket:
+    # Stands in for the websocket, whatever the gateway sends back goes nowhere
+
+    closed = False
+
+    async def send_str(self, _: str) -> None:
+        ...
+
+    async def send_bytes(self, _: bytes) -> None:
+        ...
+
+    async def close(self, **_: Any) -> None:
+        ...
+
+
+class _ReplayRunner(RunnerTrait):
+    # A recorded HELLO mustn't start real heartbeats, the replay would pay for
+    # their wakeups and the recorded ACKs would never match them anyway
+
+    __slots__: Sequence[str] = ("last_heartbeat",)
+
+    def __init__(self) -> None:
+        self.last_heartbeat = None
+
+    async def start(self, _: Gateway) -> None:
+        ...
+
+    async def beat(self, _: Gateway) -> None:
+        ...
+
+    def payload(self, sequence: int | None) -> dict[str, int | None]:
+        return {"op": OPCodes.HEARTBEAT, "d": sequence}
+
+    def ack(self) -> float:
+        return 0.0
+
+
+async def replay(
+    gateway: Gateway,
+    path: str | os.PathLike[str],
+    speed: float | None = 1.0,
+    shard_id: int | None = None,
+) -> ReplayStats:
+    # Feeds a recording through `handle_payload`. `speed` scales the recorded
+    # gaps between frames, 2.0 plays twice as fast, None as fast as possible.
+    # Captures of several shards need `shard_id` to pick one of them.
+    stats = ReplayStats()
+
+    with FrameReader(path) as reader:
+        shards = reader.shards
+        if shard_id is None and len(shards) > 1:
+            raise RecordingError(f"Recording holds shards {sorted(shards, key=str)}, pick one with shard_id.")
+        if shard_id is None and shards:
+            shard_id = next(iter(shards))
+
+        socket, gateway._socket = gateway._socket, _ReplaySocket()
+        runner_factory, gateway._runner_factory = gateway._runner_factory, _ReplayRunner
+        # The re-identify after a recorded INVALID_SESSION goes nowhere, there's nothing to wait for
+        invalid_session_delay, gateway._invalid_session_delay = gateway._invalid_session_delay, (0.0, 0.0)
+        gateway.commands.open()
+        previous: int | None = None
+        started = time.perf_counter()
+
+        try:
+            for frame in reader:
+                if frame.shard_id != shard_id:
+                    continue
+
+                if previous is not None:
+                    # Recordings appended over several runs jump back in time, never wait on that
+                    gap = max(0, frame.timestamp - previous) / 1e9
+                    stats.recorded += gap
+
+                    if speed:
+                        ahead = stats.recorded / speed - (time.perf_counter() - started)
+                        if ahead > 0:
+                            await asyncio.sleep(ahead)
+
+                previous = frame.timestamp
+
+                if frame.kind == CONNECT:
+                    meta = json.loads(frame.data)
+                    if meta.get("encoding", gateway.encoding) != gateway.encoding or bool(meta.get("compress")) != (
+                        gateway._decompressor is not None
+                    ):
+                        raise RecordingError(
+                            f"Recorded with encoding={meta.get('encoding')} compress={meta.get('compress')}, "
+                            f"the gateway has to match."
+                        )
+
+                    stats.connections += 1
+                    gateway.stop_heartbeating()
+                    gateway.cancel_identify()
+                    gateway.commands.reset()
+                    if gateway._decompressor is not None:
+                        gateway._decompressor.reset()
+                    continue
+
+                stats.frames += 1
+                stats.bytes += len(frame.data)
+                await gateway.handle_payload(frame.data)
+        finally:
+            gateway.commands.pause()
+            gateway.stop_heartbeating()
+            gateway.cancel_identify()
+            gateway._socket = socket
+            gateway._runner_factory = runner_factory
+            gateway._invalid_session_delay = invalid_session_delay
+            stats.elapsed = time.perf_counter() - started
+
+    return stats
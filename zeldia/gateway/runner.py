@@ -1,6 +1,11 @@
+from __future__ import annotations
+
 import abc
 import asyncio
+import bisect
+import collections
 import logging
+import random
 import time
 
 from typing import Sequence, TYPE_CHECKING
@@ -8,52 +13,115 @@ from typing import Sequence, TYPE_CHECKING
 from zeldia.enums.opcodes import OPCodes
 
 if TYPE_CHECKING:
-    from zeldia.client import GatewayClient
+    from zeldia.gateway.gateway import Gateway
 
 
 logger = logging.getLogger(__name__)
 
 
+class LatencyHistogram:
+
+    __slots__: Sequence[str] = ("_samples",)
+
+    BOUNDS: tuple[float, ...] = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+    def __init__(self, size: int = 128) -> None:
+        # Rolling window, old samples fall off so the numbers follow the connection
+        self._samples: collections.deque[float] = collections.deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def __repr__(self) -> str:
+        return f"LatencyHistogram(samples={len(self)}, p50={self.percentile(50):.3f}, p99={self.percentile(99):.3f})"
+
+    def record(self, latency: float) -> None:
+        self._samples.append(latency)
+
+    @property
+    def last(self) -> float:
+        return self._samples[-1] if self._samples else 0.0
+
+    @property
+    def mean(self) -> float:
+        return sum(self._samples) / len(self._samples) if self._samples else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        if not self._samples:
+            return 0.0
+
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def buckets(self, bounds: Sequence[float] | None = None) -> dict[float, int]:
+        # Sample counts per upper bound, everything above the last bound lands in inf
+        bounds = tuple(bounds or self.BOUNDS)
+        counts = dict.fromkeys((*bounds, float("inf")), 0)
+
+        for sample in self._samples:
+            index = bisect.bisect_left(bounds, sample)
+            counts[bounds[index] if index < len(bounds) else float("inf")] += 1
+
+        return counts
+
+
 class RunnerTrait(abc.ABC):
-    last_heartbeat: float
+    last_heartbeat: float | None
 
     @abc.abstractmethod
-    async def start(self, gateway: "GatewayClient") -> None:
+    async def start(self, gateway: "Gateway") -> None:
         ...
 
     @abc.abstractmethod
-    def payload(self) -> dict[str, float]:
+    async def beat(self, gateway: "Gateway") -> None:
         ...
 
     @abc.abstractmethod
-    def ack(self) -> None:
+    def payload(self, sequence: int | None) -> dict[str, int | None]:
+        ...
+
+    @abc.abstractmethod
+    def ack(self) -> float:
         ...
 
 
 class Runner(RunnerTrait):
 
-    __slots__: Sequence[str] = ("counter", "_ack", "last_heartbeat")
+    __slots__: Sequence[str] = ("_ack", "last_heartbeat", "last_ack")
 
-    last_heartbeat: float
+    last_heartbeat: float | None
 
     def __init__(self) -> None:
-        self.counter = 0
         self._ack: bool = True
         self.last_heartbeat = None
+        self.last_ack = None
+
+    async def start(self, gateway: "Gateway") -> None:
+        # Discord wants the first beat after interval * jitter, so shards that
+        # connected together don't heartbeat in lockstep.
+        await asyncio.sleep(gateway._interval * random.random())
 
-    async def start(self, gateway: "GatewayClient") -> None:
         while True:
             if not self._ack:
-                logger.error("Something went wrong, Aborting the process.")
-                gateway._close()
+                # No ACK since the last beat, the connection is a zombie. Drop it
+                # and let the gateway resume on a fresh one.
+                logger.warning("Shard %s missed a heartbeat ACK, reconnecting.", gateway.shard_id)
+                await gateway.reconnect()
+                return
 
-            await gateway._socket.send_json(self.payload())
-            self._ack = False
-            self.last_heartbeat = time.perf_counter()
+            await self.beat(gateway)
             await asyncio.sleep(gateway._interval)
 
-    def payload(self) -> dict[str, float]:
-        return {"op": OPCodes.HEARTBEAT, "d": self.counter}
+    async def beat(self, gateway: "Gateway") -> None:
+        await gateway.send(self.payload(gateway.sequence))
+        self._ack = False
+        self.last_heartbeat = time.perf_counter()
 
-    def ack(self) -> None:
+    def payload(self, sequence: int | None) -> dict[str, int | None]:
+        return {"op": OPCodes.HEARTBEAT, "d": sequence}
+
+    def ack(self) -> float:
         self._ack = True
+        self.last_ack = time.perf_counter()
+
+        return 0.0 if self.last_heartbeat is None else self.last_ack - self.last_heartbeat
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import ast
+import attrs
+import datetime
+import enum
+import logging
+import sys
+import types
+import typing
+
+from typing import Any, Optional, Sequence
+
+from zeldia.enums.interaction import InteractionType
+from zeldia.models.channel import Channel, Overwrite
+from zeldia.models.member import Member
+from zeldia.models.message import Message, MessageInteraction, MessageReference
+from zeldia.models.presence import ClientStatus, Presence
+from zeldia.models.snowflake import Snowflake
+from zeldia.models.thread import ThreadMember, ThreadMetadata
+from zeldia.models.user import User
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+logger = logging.getLogger(__name__)
+
+# Names the model annotations refer to, they're only imported under TYPE_CHECKING
+# in the model modules so they have to be supplied when resolving the hints.
+MODEL_NAMESPACE: dict[str, Any] = {
+    "datetime": datetime,
+    "Snowflake": Snowflake,
+    "InteractionType": InteractionType,
+    "User": User,
+    "Member": Member,
+    "Message": Message,
+    "MessageReference": MessageReference,
+    "MessageInteraction": MessageInteraction,
+    "Channel": Channel,
+    "Overwrite": Overwrite,
+    "ThreadMember": ThreadMember,
+    "ThreadMetadata": ThreadMetadata,
+    "Presence": Presence,
+    "ClientStatus": ClientStatus,
+}
+
+# Before 3.10 `X | None` and before 3.9 `list[X]` don't evaluate, hints that
+# fail are rewritten into their typing equivalents and evaluated with these.
+BACKPORT_NAMESPACE: dict[str, Any] = {
+    **MODEL_NAMESPACE,
+    "Union": typing.Union,
+    "list": typing.List,
+    "dict": typing.Dict,
+    "tuple": typing.Tuple,
+    "set": typing.Set,
+    "frozenset": typing.FrozenSet,
+}
+
+UNION_TYPES: tuple[Any, ...] = (typing.Union, getattr(types, "UnionType", typing.Union))
+
+HOT_EVENTS: dict[str, type] = {
+    "MESSAGE_CREATE": Message,
+    "GUILD_MEMBER_UPDATE": Member,
+    "PRESENCE_UPDATE": Presence,
+}
+
+
+class _UnionRewriter(ast.NodeTransformer):
+    # `X | Y` -> `Union[X, Y]`
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.BitOr):
+            return node
+
+        members = ast.Tuple(elts=[node.left, node.right], ctx=ast.Load())
+        return ast.Subscript(
+            value=ast.Name(id="Union", ctx=ast.Load()),
+            # Only reached before 3.10, where 3.8 still wants the Index wrapper
+            slice=ast.Index(value=members) if sys.version_info < (3, 9) else members,
+            ctx=ast.Load(),
+        )
+
+
+def _backport(annotation: str) -> Any:
+    tree = ast.fix_missing_locations(_UnionRewriter().visit(ast.parse(annotation, mode="eval")))
+    return eval(compile(tree, "<annotation>", "eval"), BACKPORT_NAMESPACE)
+
+
+def resolve_hint(annotation: Any) -> Any:
+    if not isinstance(annotation, str):
+        return annotation
+
+    try:
+        return eval(annotation, MODEL_NAMESPACE)
+    except TypeError:
+        if sys.version_info >= (3, 10):
+            # e.g. `"Message" | None`, which can't be evaluated at runtime
+            return Any
+    except NameError:
+        return Any
+
+    try:
+        return _backport(annotation)
+    except (NameError, TypeError):
+        return Any
+
+
+if msgspec is not None:
+
+    class Envelope(msgspec.Struct, gc=False):
+        # Resolved by msgspec at runtime, so no `X | None` before 3.10
+        op: int
+        d: msgspec.Raw = msgspec.Raw()
+        s: Optional[int] = None
+        t: Optional[str] = None
+
+
+class SchemaCompiler:
+
+    __slots__: Sequence[str] = ("_structs", "_building")
+
+    def __init__(self) -> None:
+        if msgspec is None:
+            raise RuntimeError("Typed decoding needs msgspec, install it with `pip install msgspec`.")
+
+        self._structs: dict[type, type] = {}
+        self._building: set[type] = set()
+
+    def struct_for(self, model: type) -> type:
+        try:
+            return self._structs[model]
+        except KeyError:
+            pass
+
+        self._building.add(model)
+
+        # Every field is optional, Discord omits keys freely and unknown keys
+        # are skipped by msgspec without being materialized.
+        fields = [
+            (field.name, typing.Optional[self._convert(resolve_hint(field.type))], None)
+            for field in attrs.fields(model)
+        ]
+
+        struct = self._structs[model] = msgspec.defstruct(
+            f"{model.__name__}Struct",
+            fields,
+            kw_only=True,
+            gc=False,
+            module=__name__,
+        )
+        self._building.discard(model)
+
+        return struct
+
+    def _convert(self, hint: Any) -> Any:
+        if hint is Snowflake:
+            return int
+
+        if hint is object or hint is Any:
+            return Any
+
+        if isinstance(hint, type) and issubclass(hint, (str, int, float, bool, datetime.datetime, enum.Enum)):
+            return hint
+
+        if isinstance(hint, type) and attrs.has(hint):
+            # Self referencing models (Message.referenced_message) stay untyped
+            return Any if hint in self._building else self.struct_for(hint)
+
+        origin = typing.get_origin(hint)
+        args = typing.get_args(hint)
+
+        if origin in UNION_TYPES:
+            converted = [self._convert(arg) for arg in args if arg is not type(None)]
+            return Any if Any in converted else typing.Union[tuple(converted)]
+
+        if origin is list:
+            return typing.List[self._convert(args[0])] if args else list
+
+        return Any
+
+
+class SchemaDecoder:
+
+    __slots__: Sequence[str] = ("_envelope", "_generic", "_decoders")
+
+    def __init__(self, events: dict[str, type] | None = None) -> None:
+        compiler = SchemaCompiler()
+
+        # The envelope keeps `d` as an undecoded slice of the frame, so only one
+        # of the typed or the generic decoder ever parses the event body.
+        self._envelope = msgspec.json.Decoder(Envelope)
+        self._generic = msgspec.json.Decoder()
+        self._decoders = {
+            event: msgspec.json.Decoder(compiler.struct_for(model), strict=False)
+            for event, model in (HOT_EVENTS if events is None else events).items()
+        }
+
+    def __contains__(self, event: str) -> bool:
+        return event in self._decoders
+
+    def decode_envelope(self, raw: bytes | str) -> Any | None:
+        # None sends the frame down the untyped path
+        try:
+            return self._envelope.decode(raw)
+        except (msgspec.ValidationError, msgspec.DecodeError) as error:
+            logger.debug("Frame doesn't fit the envelope schema, decoding it untyped: %s", error)
+            return None
+
+    def decode(self, event: str, data: msgspec.Raw) -> Any | None:
+        decoder = self._decoders.get(event)
+        if decoder is None:
+            return None
+
+        try:
+            return decoder.decode(data)
+        except msgspec.ValidationError as error:
+            # Usually an enum value Discord added after these schemas were written,
+            # the untyped model still gets through
+            logger.debug("%s doesn't fit its schema, decoding it untyped: %s", event, error)
+            return None
+
+    def decode_generic(self, data: msgspec.Raw) -> Any:
+        # An absent `d` (e.g. HEARTBEAT_ACK) leaves an empty Raw behind
+        return self._generic.decode(data) if data else None
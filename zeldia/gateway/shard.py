@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import time
+
+from typing import Any, Awaitable, Callable, Iterable, Literal, Mapping, Sequence, TYPE_CHECKING
+
+from zeldia.enums.gateway_status import GatewayStatus
+from zeldia.gateway.gateway import DispatchHookT, Gateway, current_shard
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from zeldia.rest.rest import RESTClient
+    from zeldia.rest.transport import HTTPTransport
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_current_shard() -> int | None:
+    return current_shard.get()
+
+
+def shard_for(guild_id: int, shard_count: int) -> int:
+    return (int(guild_id) >> 22) % shard_count
+
+
+class IdentifyLimiter:
+
+    __slots__: Sequence[str] = ("max_concurrency", "interval", "_locks", "_last")
+
+    def __init__(self, max_concurrency: int = 1, interval: float = 5.0) -> None:
+        self.max_concurrency = max_concurrency
+        self.interval = interval
+
+        self._locks: dict[int, asyncio.Lock] = collections.defaultdict(asyncio.Lock)
+        self._last: dict[int, float] = collections.defaultdict(float)
+
+    async def acquire(self, shard_id: int) -> None:
+        # Discord allows `max_concurrency` identifies per 5 seconds, one per
+        # rate limit key (shard_id % max_concurrency).
+        key = shard_id % self.max_concurrency
+
+        async with self._locks[key]:
+            wait = self._last[key] + self.interval - time.monotonic()
+            if wait > 0:
+                logger.debug("Shard %s waiting %.2fs to identify", shard_id, wait)
+                await asyncio.sleep(wait)
+
+            self._last[key] = time.monotonic()
+
+
+class ShardManager:
+
+    __slots__: Sequence[str] = (
+        "token",
+        "intents",
+        "emitter",
+        "session",
+        "rest",
+        "shard_count",
+        "shard_ids",
+        "identify_limiter",
+        "gateway_options",
+        "_gateways",
+        "_hooks",
+        "_tasks",
+    )
+
+    def __init__(
+        self,
+        token: str,
+        intents: Any,
+        emitter: Callable[..., Awaitable[None]],
+        session: aiohttp.ClientSession | HTTPTransport | None,
+        rest: RESTClient,
+        shard_count: int | Literal["auto"] | None = None,
+        shard_ids: Iterable[int] | None = None,
+        identify_limiter: IdentifyLimiter | None = None,
+        **gateway_options,
+    ) -> None:
+        self.token = token
+        self.intents = intents
+        self.emitter = emitter
+        self.session = session
+        self.rest = rest
+        self.shard_count = shard_count
+        self.shard_ids = None if shard_ids is None else tuple(shard_ids)
+        self.identify_limiter = identify_limiter
+        self.gateway_options = gateway_options
+
+        self._gateways: dict[int, Gateway] = {}
+        self._hooks: list[tuple[DispatchHookT, Iterable[str] | None]] = []
+        self._tasks: dict[int, asyncio.Task[None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._gateways)
+
+    def __iter__(self) -> Iterable[Gateway]:
+        return iter(self._gateways.values())
+
+    @property
+    def gateways(self) -> Mapping[int, Gateway]:
+        return self._gateways
+
+    @property
+    def is_sharded(self) -> bool:
+        return self.shard_count is not None
+
+    @property
+    def latencies(self) -> dict[int, float]:
+        return {shard_id: gateway.latency for shard_id, gateway in self._gateways.items()}
+
+    @property
+    def latency(self) -> float:
+        latencies = self.latencies
+        return sum(latencies.values()) / len(latencies) if latencies else 0.0
+
+    @property
+    def statuses(self) -> dict[int, GatewayStatus]:
+        return {shard_id: gateway.status for shard_id, gateway in self._gateways.items()}
+
+    def get(self, shard_id: int) -> Gateway | None:
+        return self._gateways.get(shard_id)
+
+    def for_guild(self, guild_id: int) -> Gateway | None:
+        if not isinstance(self.shard_count, int):
+            return self._gateways.get(0)
+
+        return self._gateways.get(shard_for(guild_id, self.shard_count))
+
+    def add_dispatch_hook(self, hook: DispatchHookT, events: Iterable[str] | None = None) -> None:
+        events = None if events is None else tuple(events)
+        self._hooks.append((hook, events))
+
+        for gateway in self._gateways.values():
+            gateway.add_dispatch_hook(hook, events)
+
+    async def fetch_recommended(self) -> tuple[int, int]:
+        data = await self.rest.get_gateway_bot()
+        limits = data.get("session_start_limit", {})
+
+        return data["shards"], limits.get("max_concurrency", 1)
+
+    def create_gateways(self) -> None:
+        shard_ids = self.shard_ids if self.shard_ids is not None else range(self.shard_count or 1)
+
+        for shard_id in shard_ids:
+            gateway = self._gateways[shard_id] = Gateway(
+                token=self.token,
+                intents=self.intents,
+                emitter=self.emitter,
+                session=self.session,
+                shard_id=shard_id if self.is_sharded else None,
+                shard_count=self.shard_count if self.is_sharded else None,
+                identify_limiter=self.identify_limiter,
+                **self.gateway_options,
+            )
+
+            for hook, events in self._hooks:
+                gateway.add_dispatch_hook(hook, events)
+
+    async def start(self) -> None:
+        max_concurrency = 1
+
+        if self.shard_count == "auto":
+            self.shard_count, max_concurrency = await self.fetch_recommended()
+            logger.info("Using %d shards (max_concurrency=%d)", self.shard_count, max_concurrency)
+
+        if self.identify_limiter is None:
+            self.identify_limiter = IdentifyLimiter(max_concurrency)
+
+        if not self._gateways:
+            self.create_gateways()
+
+        # Every shard runs its own read loop on this event loop, identifies are
+        # spaced out by the shared limiter.
+        for shard_id, gateway in self._gateways.items():
+            self._tasks[shard_id] = asyncio.ensure_future(gateway.connect())
+
+        while self._tasks:
+            done, _ = await asyncio.wait(tuple(self._tasks.values()), return_when=asyncio.FIRST_COMPLETED)
+
+            # Gateways reconnect on their own, a finished task means the shard was
+            # closed for good (or failed with a fatal close code).
+            for shard_id, task in tuple(self._tasks.items()):
+                if task in done:
+                    del self._tasks[shard_id]
+                    if not task.cancelled():
+                        task.result()
+
+    async def reconnect(self, shard_id: int) -> None:
+        await self._gateways[shard_id].reconnect()
+
+    async def close(self) -> None:
+        for gateway in self._gateways.values():
+            await gateway.close(code=1000)
+
+        for recorder in {gateway.recorder for gateway in self._gateways.values()} - {None}:
+            recorder.close()
+
+        for task in self._tasks.values():
+            task.cancel()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import attrs
+import collections
+import logging
+import time
+
+from typing import Any, Awaitable, Callable, Iterable, Sequence
+
+from zeldia.gateway.runner import LatencyHistogram
+
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchContext:
+
+    __slots__: Sequence[str] = ("event", "data", "model", "shard_id", "delivered")
+
+    def __init__(self, event: str, data: dict[str, Any] | None, model: Any, shard_id: int | None = None) -> None:
+        self.event = event
+        self.data = data
+        self.model = model
+        self.shard_id = shard_id
+        self.delivered = False
+
+    def __repr__(self) -> str:
+        return f"DispatchContext(event={self.event!r}, shard_id={self.shard_id}, delivered={self.delivered})"
+
+
+ChainT = Callable[[DispatchContext], Awaitable[None]]
+# A middleware gets the context and the rest of the chain. Not awaiting
+# `call_next(ctx)` short-circuits the dispatch, the event never reaches handlers.
+MiddlewareT = Callable[[DispatchContext, ChainT], Awaitable[None]]
+# Takes the work plus the event and model, ordered events keep their order
+ScheduleT = Callable[[Awaitable[None], str, Any], Awaitable[None]]
+
+
+def _link(middleware: MiddlewareT, call_next: ChainT) -> ChainT:
+    async def chain(ctx: DispatchContext) -> None:
+        await middleware(ctx, call_next)
+
+    return chain
+
+
+class MiddlewarePipeline:
+    # Chains run through `schedule` when there is one (the client hands in its
+    # dispatcher), so a slow middleware never holds up the shard's read loop.
+    # Events ordered with `EventDispatcher.order_by` run their chains in the
+    # same per-key queue as their handlers and still arrive in order.
+
+    __slots__: Sequence[str] = ("_emitter", "_schedule", "_middlewares", "_chains")
+
+    def __init__(
+        self,
+        emitter: Callable[[str, Any], Awaitable[None]],
+        schedule: ScheduleT | None = None,
+    ) -> None:
+        self._emitter = emitter
+        self._schedule = schedule
+        self._middlewares: list[tuple[MiddlewareT, frozenset[str] | None]] = []
+        self._chains: dict[str, ChainT | None] = {}
+
+    def __len__(self) -> int:
+        return len(self._middlewares)
+
+    def use(self, middleware: MiddlewareT, events: Iterable[str] | None = None) -> None:
+        self._middlewares.append((middleware, None if events is None else frozenset(events)))
+        self._chains.clear()
+
+    def remove(self, middleware: MiddlewareT) -> None:
+        self._middlewares = [entry for entry in self._middlewares if entry[0] is not middleware]
+        self._chains.clear()
+
+    def chain_for(self, event: str) -> ChainT | None:
+        # None means no middleware applies, the caller emits directly. Chains are
+        # composed once per event name and reused until the pipeline changes.
+        if not self._middlewares:
+            return None
+
+        try:
+            return self._chains[event]
+        except KeyError:
+            pass
+
+        middlewares = [middleware for middleware, events in self._middlewares if events is None or event in events]
+        chain = self._chains[event] = self._compose(middlewares) if middlewares else None
+
+        return chain
+
+    async def run(self, chain: ChainT, ctx: DispatchContext) -> None:
+        if self._schedule is None:
+            await self._guarded(chain, ctx)
+        else:
+            await self._schedule(self._guarded(chain, ctx), ctx.event, ctx.model)
+
+    @staticmethod
+    async def _guarded(chain: ChainT, ctx: DispatchContext) -> None:
+        # A broken middleware costs its own event, never the connection
+        try:
+            await chain(ctx)
+        except Exception:
+            logger.exception("Middleware failed while dispatching %s", ctx.event)
+
+    def _compose(self, middlewares: list[MiddlewareT]) -> ChainT:
+        emitter = self._emitter
+
+        async def deliver(ctx: DispatchContext) -> None:
+            ctx.delivered = True
+            await emitter(ctx.event, ctx.model)
+
+        chain = deliver
+        for middleware in reversed(middlewares):
+            chain = _link(middleware, chain)
+
+        return chain
+
+
+class ChainTimingMiddleware:
+    # Time spent in the middlewares after this one, up to the event being handed
+    # to the dispatcher. Handlers run as their own tasks and aren't included,
+    # their run time is in EventDispatcher.stats[event].latency.
+
+    __slots__: Sequence[str] = ("timings",)
+
+    def __init__(self) -> None:
+        self.timings: dict[str, LatencyHistogram] = collections.defaultdict(LatencyHistogram)
+
+    async def __call__(self, ctx: DispatchContext, call_next: ChainT) -> None:
+        started = time.perf_counter()
+
+        try:
+            await call_next(ctx)
+        finally:
+            self.timings[ctx.event].record(time.perf_counter() - started)
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class EventCounter:
+    seen: int = 0
+    dropped: int = 0
+
+    @property
+    def drop_rate(self) -> float:
+        return self.dropped / self.seen if self.seen else 0.0
+
+
+class CounterMiddleware:
+    # Put it first, it counts what later middlewares let through to the handlers
+
+    __slots__: Sequence[str] = ("counters",)
+
+    def __init__(self) -> None:
+        self.counters: dict[str, EventCounter] = collections.defaultdict(EventCounter)
+
+    async def __call__(self, ctx: DispatchContext, call_next: ChainT) -> None:
+        counter = self.counters[ctx.event]
+        counter.seen += 1
+
+        await call_next(ctx)
+
+        if not ctx.delivered:
+            counter.dropped += 1
@@ -1,16 +1,30 @@
 from zeldia.models.channel import Overwrite, Channel
+from zeldia.models.guild import Guild
+from zeldia.models.lazy import LazyMessage
+from zeldia.models.member import Member
 from zeldia.models.message import MessageReference, MessageInteraction, Message
-from zeldia.models.snowflake import Snowflake
+from zeldia.models.presence import ClientStatus, Presence
+from zeldia.models.snowflake import Snowflake, SnowflakeArray, SnowflakeSet, snowflake_at
 from zeldia.models.thread import ThreadMetadata, ThreadMember
+from zeldia.models.user import User
 
 
 __all__: tuple[str, ...] = (
     "Overwrite",
     "Channel",
+    "ClientStatus",
+    "Guild",
+    "LazyMessage",
+    "Member",
     "MessageReference",
     "Message",
     "MessageInteraction",
+    "Presence",
     "Snowflake",
+    "SnowflakeArray",
+    "SnowflakeSet",
     "ThreadMetadata",
     "ThreadMember",
+    "User",
+    "snowflake_at",
 )
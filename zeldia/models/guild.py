@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import attrs
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zeldia.models.snowflake import Snowflake
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class Guild:
+    id: Snowflake
+    name: str | None
+    icon: str | None
+    splash: str | None
+    discovery_splash: str | None
+    owner_id: Snowflake | None
+    afk_channel_id: Snowflake | None
+    afk_timeout: int | None
+    verification_level: int | None
+    default_message_notifications: int | None
+    explicit_content_filter: int | None
+    roles: list[object]  # TODO: Change this to list[Role]
+    emojis: list[object]  # TODO: Change this to list[Emoji]
+    features: list[str]
+    mfa_level: int | None
+    application_id: Snowflake | None
+    system_channel_id: Snowflake | None
+    system_channel_flags: int | None
+    rules_channel_id: Snowflake | None
+    max_members: int | None
+    vanity_url_code: str | None
+    description: str | None
+    banner: str | None
+    premium_tier: int | None
+    premium_subscription_count: int | None
+    preferred_locale: str | None
+    public_updates_channel_id: Snowflake | None
+    nsfw_level: int | None
+    premium_progress_bar_enabled: bool | None
+    member_count: int | None
+    large: bool | None
+    unavailable: bool | None
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import datetime
+
+from typing import Any, Sequence
+
+from zeldia import converters
+from zeldia.models.message import MessageReference
+from zeldia.models.snowflake import Snowflake
+from zeldia.models.user import User
+
+
+def _parse_timestamp(value: str | None) -> datetime.datetime | None:
+    return None if value is None else datetime.datetime.fromisoformat(value)
+
+
+def _parse_snowflake(value: str | int | None) -> Snowflake | None:
+    return None if value is None else Snowflake(value)
+
+
+class LazyMessage:
+    # Wraps the raw MESSAGE_CREATE payload and only builds typed values the first
+    # time they're accessed. Unset slots raise AttributeError, which doubles as the
+    # "not parsed yet" marker so construction costs a single attribute store.
+
+    __slots__: Sequence[str] = (
+        "_payload",
+        "_id",
+        "_channel_id",
+        "_guild_id",
+        "_author",
+        "_timestamp",
+        "_edited_timestamp",
+        "_mentions",
+        "_mention_roles",
+        "_webhook_id",
+        "_application_id",
+        "_message_reference",
+        "_referenced_message",
+    )
+
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self._payload = payload
+
+    def __repr__(self) -> str:
+        return f"LazyMessage(id={self._payload.get('id')!r}, channel_id={self._payload.get('channel_id')!r})"
+
+    @property
+    def raw(self) -> dict[str, Any]:
+        return self._payload
+
+    @property
+    def id(self) -> Snowflake:
+        try:
+            return self._id
+        except AttributeError:
+            self._id = Snowflake(self._payload["id"])
+            return self._id
+
+    @property
+    def channel_id(self) -> Snowflake:
+        try:
+            return self._channel_id
+        except AttributeError:
+            self._channel_id = Snowflake(self._payload["channel_id"])
+            return self._channel_id
+
+    @property
+    def guild_id(self) -> Snowflake | None:
+        try:
+            return self._guild_id
+        except AttributeError:
+            self._guild_id = _parse_snowflake(self._payload.get("guild_id"))
+            return self._guild_id
+
+    @property
+    def author(self) -> User:
+        try:
+            return self._author
+        except AttributeError:
+            self._author = converters.payload_to_user(self._payload["author"])
+            return self._author
+
+    @property
+    def timestamp(self) -> datetime.datetime:
+        try:
+            return self._timestamp
+        except AttributeError:
+            self._timestamp = _parse_timestamp(self._payload.get("timestamp"))
+            return self._timestamp
+
+    @property
+    def edited_timestamp(self) -> datetime.datetime | None:
+        try:
+            return self._edited_timestamp
+        except AttributeError:
+            self._edited_timestamp = _parse_timestamp(self._payload.get("edited_timestamp"))
+            return self._edited_timestamp
+
+    @property
+    def mentions(self) -> list[User]:
+        try:
+            return self._mentions
+        except AttributeError:
+            self._mentions = [converters.payload_to_user(user) for user in self._payload.get("mentions", ())]
+            return self._mentions
+
+    @property
+    def mention_roles(self) -> list[Snowflake]:
+        try:
+            return self._mention_roles
+        except AttributeError:
+            self._mention_roles = [Snowflake(role) for role in self._payload.get("mention_roles", ())]
+            return self._mention_roles
+
+    @property
+    def webhook_id(self) -> Snowflake | None:
+        try:
+            return self._webhook_id
+        except AttributeError:
+            self._webhook_id = _parse_snowflake(self._payload.get("webhook_id"))
+            return self._webhook_id
+
+    @property
+    def application_id(self) -> Snowflake | None:
+        try:
+            return self._application_id
+        except AttributeError:
+            self._application_id = _parse_snowflake(self._payload.get("application_id"))
+            return self._application_id
+
+    @property
+    def message_reference(self) -> MessageReference | None:
+        try:
+            return self._message_reference
+        except AttributeError:
+            reference = self._payload.get("message_reference")
+            self._message_reference = (
+                None
+                if reference is None
+                else MessageReference(
+                    message_id=_parse_snowflake(reference.get("message_id")),
+                    channel_id=_parse_snowflake(reference.get("channel_id")),
+                    guild_id=_parse_snowflake(reference.get("guild_id")),
+                    fail_if_not_exists=reference.get("fail_if_not_exists"),
+                )
+            )
+            return self._message_reference
+
+    @property
+    def referenced_message(self) -> LazyMessage | None:
+        try:
+            return self._referenced_message
+        except AttributeError:
+            referenced = self._payload.get("referenced_message")
+            self._referenced_message = None if referenced is None else LazyMessage(referenced)
+            return self._referenced_message
+
+    # Plain values are read straight from the payload, nothing to parse or memoize.
+
+    @property
+    def content(self) -> str | None:
+        return self._payload.get("content")
+
+    @property
+    def tts(self) -> bool:
+        return self._payload.get("tts", False)
+
+    @property
+    def mention_everyone(self) -> bool:
+        return self._payload.get("mention_everyone", False)
+
+    @property
+    def mention_channels(self) -> list[object]:
+        return self._payload.get("mention_channels", [])
+
+    @property
+    def attachments(self) -> list[object]:
+        return self._payload.get("attachments", [])
+
+    @property
+    def embeds(self) -> list[object]:
+        return self._payload.get("embeds", [])
+
+    @property
+    def reactions(self) -> list[object]:
+        return self._payload.get("reactions", [])
+
+    @property
+    def nonce(self) -> int | str | None:
+        return self._payload.get("nonce")
+
+    @property
+    def pinned(self) -> bool:
+        return self._payload.get("pinned", False)
+
+    @property
+    def type(self) -> int:
+        return self._payload.get("type", 0)
+
+    @property
+    def activity(self) -> object:
+        return self._payload.get("activity")
+
+    @property
+    def application(self) -> object:
+        return self._payload.get("application")
+
+    @property
+    def flags(self) -> int | None:
+        return self._payload.get("flags")
+
+    @property
+    def interaction(self) -> object | None:
+        return self._payload.get("interaction")
+
+    @property
+    def thread(self) -> object | None:
+        return self._payload.get("thread")
+
+    @property
+    def components(self) -> list[object] | None:
+        return self._payload.get("components")
+
+    @property
+    def sticker_items(self) -> list[object] | None:
+        return self._payload.get("sticker_items")
+
+    @property
+    def stickers(self) -> list[object] | None:
+        return self._payload.get("stickers")
+
+    @property
+    def position(self) -> int | None:
+        return self._payload.get("position")
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import attrs
+import datetime
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zeldia.models.snowflake import Snowflake
+    from zeldia.models.user import User
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class Member:
+    guild_id: Snowflake | None
+    user: User | None
+    nick: str | None
+    avatar: str | None
+    roles: list[Snowflake]
+    joined_at: datetime.datetime | None
+    premium_since: datetime.datetime | None
+    deaf: bool | None
+    mute: bool | None
+    pending: bool | None
+    permissions: str | None
+    communication_disabled_until: datetime.datetime | None
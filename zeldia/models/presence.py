@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import attrs
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zeldia.models.snowflake import Snowflake
+    from zeldia.models.user import User
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class ClientStatus:
+    desktop: str | None = None
+    mobile: str | None = None
+    web: str | None = None
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class Presence:
+    user: User  # Only `id` is guaranteed to be present
+    guild_id: Snowflake | None
+    status: str | None
+    activities: list[object]  # TODO: Change this to list[Activity]
+    client_status: ClientStatus | None
@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import array
+import bisect
 import datetime
+import heapq
 
-from typing import final
+from typing import Any, Iterable, Iterator, Sequence, final, overload
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DISCORD_EPOCH = 1420070400000
 
 
 @final
@@ -12,8 +22,7 @@ class Snowflake(int):
 
     @property
     def created_at(self) -> datetime.datetime:
-        epoch = (self >> 22) / 1000
-        epoch += 1420070400000
+        epoch = ((self >> 22) + DISCORD_EPOCH) / 1000
 
         return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc)
 
@@ -28,3 +37,261 @@ class Snowflake(int):
     @property
     def increment(self) -> int:
         return self & 0xFFF
+
+
+def snowflake_at(when: datetime.datetime) -> int:
+    # The smallest id Discord could hand out at `when`, handy as a range bound
+    milliseconds = int(when.timestamp() * 1000) - DISCORD_EPOCH
+    return max(0, milliseconds) << 22
+
+
+def _array(values: Iterable[Any] = ()) -> array.array[int]:
+    if isinstance(values, _SnowflakeContainer):
+        return array.array("Q", values._data)
+
+    return array.array("Q", map(int, values))
+
+
+def _restore(cls: type[_SnowflakeContainer], data: bytes) -> Any:
+    instance = cls.__new__(cls)
+    instance._data = array.array("Q")
+    instance._data.frombytes(data)
+    return instance
+
+
+def _from_numpy(values: Any) -> array.array[int]:
+    data = array.array("Q")
+    data.frombytes(values.astype(numpy.uint64).tobytes())
+    return data
+
+
+class _SnowflakeContainer:
+    # Ids live in one array of unsigned 64 bit ints, 8 bytes apiece against the
+    # ~32 of an int object plus the pointer to it in a list or set. Snowflake
+    # objects are only made for the ids you actually take out.
+
+    __slots__: Sequence[str] = ("_data",)
+
+    _data: array.array[int]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[Snowflake]:
+        return map(Snowflake, self._data)
+
+    def __bool__(self) -> bool:
+        return bool(self._data)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, _SnowflakeContainer):
+            return type(self) is type(other) and self._data == other._data
+
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        ids = ", ".join(map(str, self._data[:5]))
+        more = ", ..." if len(self._data) > 5 else ""
+        return f"{type(self).__name__}([{ids}{more}], size={len(self._data)})"
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return _restore, (type(self), self._data.tobytes())
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._data) * self._data.itemsize
+
+    def tobytes(self) -> bytes:
+        return self._data.tobytes()
+
+    def _numpy(self) -> Any:
+        return numpy.frombuffer(self._data, dtype=numpy.uint64)
+
+    def timestamps(self) -> array.array[float]:
+        # Unix seconds, one per id
+        if numpy is not None:
+            return array.array("d", (((self._numpy() >> 22) + DISCORD_EPOCH) / 1000).tobytes())
+
+        return array.array("d", [((value >> 22) + DISCORD_EPOCH) / 1000 for value in self._data])
+
+    def created_at(self) -> list[datetime.datetime]:
+        utc = datetime.timezone.utc
+        return [datetime.datetime.fromtimestamp(timestamp, utc) for timestamp in self.timestamps()]
+
+    def worker_ids(self) -> array.array[int]:
+        if numpy is not None:
+            return array.array("B", ((self._numpy() & 0x3E0000) >> 17).astype(numpy.uint8).tobytes())
+
+        return array.array("B", [(value & 0x3E0000) >> 17 for value in self._data])
+
+    def process_ids(self) -> array.array[int]:
+        if numpy is not None:
+            return array.array("B", ((self._numpy() & 0x1F000) >> 12).astype(numpy.uint8).tobytes())
+
+        return array.array("B", [(value & 0x1F000) >> 12 for value in self._data])
+
+    def increments(self) -> array.array[int]:
+        if numpy is not None:
+            return array.array("H", (self._numpy() & 0xFFF).astype(numpy.uint16).tobytes())
+
+        return array.array("H", [value & 0xFFF for value in self._data])
+
+
+class SnowflakeArray(_SnowflakeContainer):
+    # Ordered, duplicates allowed, like the list it replaces
+
+    __slots__: Sequence[str] = ()
+
+    def __init__(self, ids: Iterable[int | str] = ()) -> None:
+        self._data = _array(ids)
+
+    @classmethod
+    def frombytes(cls, data: bytes) -> SnowflakeArray:
+        return _restore(cls, data)
+
+    @overload
+    def __getitem__(self, index: int) -> Snowflake:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> SnowflakeArray:
+        ...
+
+    def __getitem__(self, index: int | slice) -> Snowflake | SnowflakeArray:
+        if isinstance(index, slice):
+            instance = SnowflakeArray()
+            instance._data = self._data[index]
+            return instance
+
+        return Snowflake(self._data[index])
+
+    def __contains__(self, snowflake: object) -> bool:
+        try:
+            return int(snowflake) in self._data
+        except (TypeError, ValueError, OverflowError):
+            return False
+
+    def append(self, snowflake: int | str) -> None:
+        self._data.append(int(snowflake))
+
+    def extend(self, ids: Iterable[int | str]) -> None:
+        self._data.extend(map(int, ids))
+
+    def to_set(self) -> SnowflakeSet:
+        return SnowflakeSet(self._data)
+
+
+class SnowflakeSet(_SnowflakeContainer):
+    # Kept sorted and unique. Membership is a binary search, set operations are
+    # merges of two sorted runs, and because ids grow with time a creation time
+    # range is just a slice.
+
+    __slots__: Sequence[str] = ()
+
+    def __init__(self, ids: Iterable[int | str] = ()) -> None:
+        if isinstance(ids, SnowflakeSet):
+            self._data = array.array("Q", ids._data)
+        elif numpy is not None:
+            self._data = _from_numpy(numpy.unique(numpy.frombuffer(_array(ids), dtype=numpy.uint64)))
+        else:
+            self._data = array.array("Q", sorted(set(_array(ids))))
+
+    @classmethod
+    def _sorted(cls, data: array.array[int]) -> SnowflakeSet:
+        # `data` has to be sorted and unique already
+        instance = cls.__new__(cls)
+        instance._data = data
+        return instance
+
+    def __getitem__(self, index: int) -> Snowflake:
+        return Snowflake(self._data[index])
+
+    def __contains__(self, snowflake: object) -> bool:
+        try:
+            value = int(snowflake)
+        except (TypeError, ValueError):
+            return False
+
+        index = bisect.bisect_left(self._data, value)
+        return index < len(self._data) and self._data[index] == value
+
+    def add(self, snowflake: int | str) -> None:
+        value = int(snowflake)
+        index = bisect.bisect_left(self._data, value)
+
+        if index == len(self._data) or self._data[index] != value:
+            self._data.insert(index, value)
+
+    def discard(self, snowflake: int | str) -> None:
+        value = int(snowflake)
+        index = bisect.bisect_left(self._data, value)
+
+        if index < len(self._data) and self._data[index] == value:
+            del self._data[index]
+
+    def remove(self, snowflake: int | str) -> None:
+        if snowflake not in self:
+            raise KeyError(snowflake)
+
+        self.discard(snowflake)
+
+    def update(self, ids: Iterable[int | str]) -> None:
+        # One merge for the whole batch instead of an insert per id
+        self._data = self.union(SnowflakeSet(ids))._data
+
+    def union(self, other: Iterable[int | str]) -> SnowflakeSet:
+        other = other if isinstance(other, SnowflakeSet) else SnowflakeSet(other)
+
+        if numpy is not None:
+            return self._sorted(_from_numpy(numpy.union1d(self._numpy(), other._numpy())))
+
+        data = array.array("Q")
+        last = None
+        for value in heapq.merge(self._data, other._data):
+            if value != last:
+                data.append(value)
+                last = value
+
+        return self._sorted(data)
+
+    def intersection(self, other: Iterable[int | str]) -> SnowflakeSet:
+        other = other if isinstance(other, SnowflakeSet) else SnowflakeSet(other)
+
+        if numpy is not None:
+            return self._sorted(_from_numpy(numpy.intersect1d(self._numpy(), other._numpy(), assume_unique=True)))
+
+        # A throwaway hash set of the smaller side keeps the per id work in C
+        small, large = (self, other) if len(self) <= len(other) else (other, self)
+        lookup = set(small._data)
+        return self._sorted(array.array("Q", [value for value in large._data if value in lookup]))
+
+    def difference(self, other: Iterable[int | str]) -> SnowflakeSet:
+        other = other if isinstance(other, SnowflakeSet) else SnowflakeSet(other)
+
+        if numpy is not None:
+            return self._sorted(_from_numpy(numpy.setdiff1d(self._numpy(), other._numpy(), assume_unique=True)))
+
+        lookup = set(other._data)
+        return self._sorted(array.array("Q", [value for value in self._data if value not in lookup]))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def created_between(
+        self,
+        start: datetime.datetime | None = None,
+        end: datetime.datetime | None = None,
+    ) -> SnowflakeSet:
+        # Ids created in [start, end)
+        data = self._data
+        low = 0 if start is None else bisect.bisect_left(data, snowflake_at(start))
+        high = len(data) if end is None else bisect.bisect_left(data, snowflake_at(end))
+
+        return self._sorted(data[low:high])
+
+    def oldest(self) -> Snowflake | None:
+        return Snowflake(self._data[0]) if self._data else None
+
+    def newest(self) -> Snowflake | None:
+        return Snowflake(self._data[-1]) if self._data else None
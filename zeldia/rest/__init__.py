@@ -1,5 +1,21 @@
+from zeldia.rest.cache import ResponseCache
+from zeldia.rest.ratelimit import Bucket, GlobalRateLimit, RateLimiter
 from zeldia.rest.rest import RESTClient
+from zeldia.rest.retry import RetryPolicy, RouteRetryStats
 from zeldia.rest.route import Route
+from zeldia.rest.transport import HTTPTransport, PoolStats, TransportSettings
 
 
-__all__: tuple[str, ...] = ("RESTClient", "Route")
+__all__: tuple[str, ...] = (
+    "Bucket",
+    "GlobalRateLimit",
+    "HTTPTransport",
+    "PoolStats",
+    "RateLimiter",
+    "ResponseCache",
+    "RESTClient",
+    "RetryPolicy",
+    "RouteRetryStats",
+    "Route",
+    "TransportSettings",
+)
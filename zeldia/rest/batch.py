@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from typing import Any, Awaitable, Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DISCORD_EPOCH = 1420070400000
+# Bulk delete refuses anything older than two weeks, a little slack for clock skew
+BULK_DELETE_MAX_AGE = 14 * 24 * 60 * 60 - 60
+BULK_DELETE_LIMIT = 100
+HISTORY_PAGE_LIMIT = 100
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    chunk: list[T] = []
+
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def snowflake_timestamp(snowflake: int | str) -> float:
+    return ((int(snowflake) >> 22) + DISCORD_EPOCH) / 1000
+
+
+def is_bulk_deletable(snowflake: int | str, now: float | None = None) -> bool:
+    return (time.time() if now is None else now) - snowflake_timestamp(snowflake) < BULK_DELETE_MAX_AGE
+
+
+async def map_concurrent(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    *,
+    concurrency: int = 8,
+    return_exceptions: bool = False,
+) -> list[R | BaseException]:
+    # A fixed set of workers pulls from one iterator, so a backfill over 100k ids
+    # doesn't create 100k tasks that all pile up in the same rate limit bucket.
+    # The buckets still decide the actual pace, this only caps what's in flight.
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+
+    items = iter(enumerate(items))
+    results: dict[int, Any] = {}
+
+    async def worker() -> None:
+        for index, item in items:
+            try:
+                results[index] = await func(item)
+            except Exception as error:
+                if not return_exceptions:
+                    raise
+                results[index] = error
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+
+    return [results[index] for index in range(len(results))]
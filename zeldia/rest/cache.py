@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import time
+
+from typing import Any, Awaitable, Callable, Mapping, Sequence, Tuple
+
+from zeldia.rest.route import Route
+
+
+CacheKeyT = Tuple[str, str]
+
+
+def estimate_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, separators=(",", ":")))
+    except (TypeError, ValueError):
+        return len(str(value))
+
+
+class CacheEntry:
+
+    __slots__: Sequence[str] = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: float, size: int) -> None:
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class ResponseCache:
+
+    __slots__: Sequence[str] = (
+        "default_ttl",
+        "ttls",
+        "max_entries",
+        "max_bytes",
+        "sizeof",
+        "hits",
+        "misses",
+        "coalesced",
+        "_entries",
+        "_inflight",
+        "_size",
+    )
+
+    # Gateway events that make a cached GET stale, mapped to the paths they invalidate.
+    INVALIDATIONS: Mapping[str, Callable[[dict[str, Any]], Sequence[str]]] = {
+        "CHANNEL_UPDATE": lambda d: (f"/channels/{d['id']}",),
+        "CHANNEL_DELETE": lambda d: (f"/channels/{d['id']}",),
+        "THREAD_UPDATE": lambda d: (f"/channels/{d['id']}",),
+        "THREAD_DELETE": lambda d: (f"/channels/{d['id']}",),
+        "GUILD_UPDATE": lambda d: (f"/guilds/{d['id']}",),
+        "GUILD_DELETE": lambda d: (f"/guilds/{d['id']}",),
+        "GUILD_ROLE_CREATE": lambda d: (f"/guilds/{d['guild_id']}/roles",),
+        "GUILD_ROLE_UPDATE": lambda d: (f"/guilds/{d['guild_id']}/roles",),
+        "GUILD_ROLE_DELETE": lambda d: (f"/guilds/{d['guild_id']}/roles",),
+        "GUILD_MEMBER_UPDATE": lambda d: (f"/guilds/{d['guild_id']}/members/{d['user']['id']}",),
+        "GUILD_MEMBER_REMOVE": lambda d: (f"/guilds/{d['guild_id']}/members/{d['user']['id']}",),
+        "USER_UPDATE": lambda d: ("/users/@me", f"/users/{d['id']}"),
+        "MESSAGE_UPDATE": lambda d: (f"/channels/{d['channel_id']}/messages/{d['id']}",),
+        "MESSAGE_DELETE": lambda d: (f"/channels/{d['channel_id']}/messages/{d['id']}",),
+    }
+
+    def __init__(
+        self,
+        *,
+        default_ttl: float | None = 60.0,
+        ttls: Mapping[str, float | None] | None = None,
+        max_entries: int | None = 1024,
+        max_bytes: int | None = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ) -> None:
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls) if ttls else {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._entries: collections.OrderedDict[CacheKeyT, CacheEntry] = collections.OrderedDict()
+        self._inflight: dict[CacheKeyT, asyncio.Future[Any]] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def ttl_for(self, route: Route) -> float | None:
+        # Most specific first: "GET /channels/{id}", then "/channels/{id}"
+        for key in (route.route_key, route.template):
+            if key in self.ttls:
+                return self.ttls[key]
+
+        return self.default_ttl
+
+    def get(self, route: Route) -> Any | None:
+        key = (route.method, route.url)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._evict(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def put(self, route: Route, value: Any) -> None:
+        ttl = self.ttl_for(route)
+
+        if not ttl:
+            return
+
+        key = (route.method, route.url)
+        if key in self._entries:
+            self._evict(key)
+
+        entry = self._entries[key] = CacheEntry(value, time.monotonic() + ttl, self.sizeof(value))
+        self._size += entry.size
+
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._size > self.max_bytes)
+        ):
+            self._evict(next(iter(self._entries)))
+
+    async def fetch(self, route: Route, loader: Callable[[], Awaitable[Any]]) -> Any:
+        key = (route.method, route.url)
+        entry = self._entries.get(key)
+
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        task = self._inflight[key] = asyncio.ensure_future(self._load(route, loader))
+        task.add_done_callback(lambda _: self._inflight.pop(key) if self._inflight.get(key) is task else None)
+
+        # Shielded so a cancelled caller doesn't cancel the request others wait on
+        return await asyncio.shield(task)
+
+    async def _load(self, route: Route, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+
+        # Don't store a response that was invalidated while it was in flight
+        if self._inflight.get((route.method, route.url)) is asyncio.current_task():
+            self.put(route, value)
+
+        return value
+
+    def invalidate(self, path: str) -> None:
+        key = ("GET", Route.BASE_URL + path)
+
+        self._inflight.pop(key, None)
+        if key in self._entries:
+            self._evict(key)
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        url = Route.BASE_URL + prefix
+
+        for key in [key for key in self._inflight if key[1].startswith(url)]:
+            del self._inflight[key]
+
+        for key in [key for key in self._entries if key[1].startswith(url)]:
+            self._evict(key)
+
+    def handle_event(self, event: str, data: dict[str, Any], model: Any = None) -> None:
+        paths = self.INVALIDATIONS.get(event)
+
+        # Requests still in flight have to hear about it too, or they'd store what's stale
+        if paths is None or not (self._entries or self._inflight):
+            return
+
+        try:
+            for path in paths(data):
+                self.invalidate(path)
+        except (KeyError, TypeError):
+            return
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def _evict(self, key: CacheKeyT) -> None:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
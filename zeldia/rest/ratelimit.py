@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import time
+
+from typing import Mapping, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from zeldia.rest.route import Route
+
+
+logger = logging.getLogger(__name__)
+
+
+class Bucket:
+
+    __slots__: Sequence[str] = (
+        "key",
+        "limit",
+        "remaining",
+        "reset_at",
+        "period",
+        "unlimited",
+        "_lock",
+        "_discovery",
+    )
+
+    limit: int | None
+    remaining: int | None
+    reset_at: float
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.period = 0.0
+        self.unlimited = False
+
+        self._lock = asyncio.Lock()
+        self._discovery: asyncio.Event | None = None
+
+    def __repr__(self) -> str:
+        return f"Bucket(key={self.key!r}, limit={self.limit}, remaining={self.remaining})"
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            # Until the first response tells us the limits of this bucket only one
+            # request may be in flight, everything else queues up behind the lock.
+            while self.limit is None and not self.unlimited:
+                if self._discovery is None:
+                    self._discovery = asyncio.Event()
+                    return
+
+                await self._discovery.wait()
+
+            now = time.monotonic()
+            if self.reset_at <= now:
+                self._reset(now)
+            elif self.remaining is not None and self.remaining <= 0:
+                logger.debug("Bucket %s exhausted, waiting %.3fs for reset", self.key, self.reset_at - now)
+                await asyncio.sleep(self.reset_at - now)
+                self._reset(time.monotonic())
+
+            if self.remaining is not None and not self.unlimited:
+                self.remaining -= 1
+
+    def _reset(self, now: float) -> None:
+        # The new window only becomes known with the next response. Until then
+        # assume it is as long as the longest one seen, or every request queued
+        # behind the reset would see an expired window and reset it once more.
+        self.remaining = self.limit
+        self.reset_at = now + self.period
+
+    def update(self, headers: Mapping[str, str] | None) -> None:
+        if headers is not None and "X-RateLimit-Limit" in headers:
+            self.limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers.get("X-RateLimit-Remaining", self.limit))
+            reset_after = float(headers.get("X-RateLimit-Reset-After", 0))
+            reset_at = time.monotonic() + reset_after
+            self.period = max(self.period, reset_after)
+
+            if reset_at > self.reset_at + 0.001 or self.remaining is None:
+                self.remaining = remaining
+            else:
+                self.remaining = min(self.remaining, remaining)
+
+            self.reset_at = reset_at
+        elif headers is not None and self.limit is None:
+            self.unlimited = True
+
+        self.release()
+
+    def lock_for(self, delay: float) -> None:
+        self.remaining = 0
+        self.reset_at = max(self.reset_at, time.monotonic() + delay)
+
+    def release(self) -> None:
+        if self._discovery is not None and not self._discovery.is_set():
+            self._discovery.set()
+            if self.limit is None and not self.unlimited:
+                # Discovery failed (e.g. connection error), let the next request try.
+                self._discovery = None
+
+
+class GlobalRateLimit:
+
+    __slots__: Sequence[str] = ("limit", "period", "_calls", "_locked_until", "_lock")
+
+    def __init__(self, limit: int = 50, period: float = 1.0) -> None:
+        self.limit = limit
+        self.period = period
+
+        self._calls: collections.deque[float] = collections.deque(maxlen=limit)
+        self._locked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+
+            if self._locked_until > now:
+                await asyncio.sleep(self._locked_until - now)
+                now = time.monotonic()
+
+            if len(self._calls) == self.limit and now - self._calls[0] < self.period:
+                await asyncio.sleep(self.period - (now - self._calls[0]))
+                now = time.monotonic()
+
+            self._calls.append(now)
+
+    def lock_for(self, delay: float) -> None:
+        logger.warning("Hit the global rate limit, pausing every request for %.3fs", delay)
+        self._locked_until = max(self._locked_until, time.monotonic() + delay)
+
+
+class RateLimiter:
+
+    __slots__: Sequence[str] = ("global_limit", "_hashes", "_buckets")
+
+    def __init__(self, global_limit: GlobalRateLimit | None = None) -> None:
+        self.global_limit = GlobalRateLimit() if global_limit is None else global_limit
+
+        self._hashes: dict[str, str] = {}
+        self._buckets: dict[str, Bucket] = {}
+
+    @property
+    def buckets(self) -> Mapping[str, Bucket]:
+        return self._buckets
+
+    def bucket_key(self, route: Route) -> str:
+        route_key = route.route_key
+        return f"{self._hashes.get(route_key, route_key)}:{route.major_parameter}"
+
+    def get_bucket(self, route: Route) -> Bucket:
+        key = self.bucket_key(route)
+
+        try:
+            return self._buckets[key]
+        except KeyError:
+            bucket = self._buckets[key] = Bucket(key)
+            return bucket
+
+    async def acquire(self, route: Route) -> Bucket:
+        bucket = self.get_bucket(route)
+
+        await bucket.acquire()
+        await self.global_limit.acquire()
+
+        return bucket
+
+    def update(self, route: Route, bucket: Bucket, headers: Mapping[str, str]) -> None:
+        bucket_hash = headers.get("X-RateLimit-Bucket")
+        route_key = route.route_key
+
+        if bucket_hash is not None and self._hashes.get(route_key) != bucket_hash:
+            # The route turned out to share a bucket with other routes, carry the
+            # state we already have over to the key derived from the hash.
+            self._hashes[route_key] = bucket_hash
+            self._buckets.setdefault(self.bucket_key(route), bucket)
+
+        bucket.update(headers)
+
+    def handle_ratelimited(self, bucket: Bucket, retry_after: float, *, is_global: bool = False) -> None:
+        if is_global:
+            self.global_limit.lock_for(retry_after)
+        else:
+            bucket.lock_for(retry_after)
@@ -2,25 +2,76 @@ from __future__ import annotations
 
 import aiohttp
 import asyncio
+import collections
+import logging
+import time
 
-from typing import Sequence
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Mapping, Sequence
 
+from zeldia.codec import CodecTrait, get_codec
+from zeldia.rest.batch import (
+    BULK_DELETE_LIMIT,
+    HISTORY_PAGE_LIMIT,
+    chunked,
+    is_bulk_deletable,
+    map_concurrent,
+)
+from zeldia.rest.cache import ResponseCache
+from zeldia.rest.ratelimit import RateLimiter
+from zeldia.rest.retry import RetryPolicy, RouteRetryStats
 from zeldia.rest.route import Route
-from zeldia.exceptions import InvalidRequest, MissingPermission
+from zeldia.rest.transport import HTTPTransport
+from zeldia.exceptions import InvalidRequest, MissingPermission, RetriesExhausted
+
+
+logger = logging.getLogger(__name__)
 
 
 class RESTClient:
 
-    __slots__: Sequence[str] = ("_session", "_lock", "token")
+    __slots__: Sequence[str] = (
+        "_transport",
+        "_ratelimiter",
+        "_retry_stats",
+        "base_url",
+        "cache",
+        "codec",
+        "retry_policy",
+        "token",
+    )
 
     USER_AGENT = "DiscordBot (https://github.com/vedrecide/zeldia, 0.0.1)"
 
     def __init__(
-        self, token: str, session: aiohttp.ClientSession = aiohttp.ClientSession()
+        self,
+        token: str,
+        session: aiohttp.ClientSession | HTTPTransport | None = None,
+        ratelimiter: RateLimiter | None = None,
+        retry_policy: RetryPolicy | None = None,
+        cache: ResponseCache | None = None,
+        codec: CodecTrait | str | None = None,
+        base_url: str | None = None,
     ) -> None:
         self.token = token
-        self._session = session
-        self._lock = asyncio.Lock()
+        self.base_url = base_url
+        self.cache = cache
+        self.codec = get_codec(codec)
+        self.retry_policy = RetryPolicy() if retry_policy is None else retry_policy
+        self._transport = session if isinstance(session, HTTPTransport) else HTTPTransport(session=session)
+        self._ratelimiter = RateLimiter() if ratelimiter is None else ratelimiter
+        self._retry_stats: dict[str, RouteRetryStats] = collections.defaultdict(RouteRetryStats)
+
+    @property
+    def transport(self) -> HTTPTransport:
+        return self._transport
+
+    @property
+    def ratelimiter(self) -> RateLimiter:
+        return self._ratelimiter
+
+    @property
+    def retry_stats(self) -> Mapping[str, RouteRetryStats]:
+        return self._retry_stats
 
     async def fetch(
         self,
@@ -28,8 +79,11 @@ class RESTClient:
         *,
         headers: dict | None = None,
         data: dict | None = None,
+        params: dict | None = None,
         text_response: bool = False,
         return_status: bool = False,
+        retry: RetryPolicy | None = None,
+        use_cache: bool = True,
     ) -> dict | str:
         if headers is None:
             headers = {}
@@ -40,44 +94,261 @@ class RESTClient:
             **headers,
         }
 
-        async with self._lock:
-            async with self._session.request(
-                method=route.method, url=route.url, headers=headers, data=data
-            ) as res:
-                if return_status:
-                    return res.status
+        body = None
+        if data is not None:
+            body = self.codec.dumps(data)
+            headers.setdefault("Content-Type", "application/json")
+
+        # The cache is keyed by route alone and holds decoded JSON, query strings
+        # would collide in it and text responses would come back as the wrong type
+        if (
+            self.cache is not None
+            and use_cache
+            and route.method == "GET"
+            and not (return_status or text_response or params)
+        ):
+            return await self.cache.fetch(
+                route,
+                lambda: self._request(route, headers, body, params, text_response, return_status, retry),
+            )
+
+        return await self._request(route, headers, body, params, text_response, return_status, retry)
+
+    async def _request(
+        self,
+        route: Route,
+        headers: dict,
+        body: str | None,
+        params: dict | None,
+        text_response: bool,
+        return_status: bool,
+        retry: RetryPolicy | None,
+    ) -> dict | str:
+        policy = self.retry_policy if retry is None else retry
+        deadline = None if policy.deadline is None else time.monotonic() + policy.deadline
+        stats = self._retry_stats[route.route_key]
+        url = route.url if self.base_url is None else self.base_url + route.path
+
+        for attempt in range(policy.max_attempts):
+            bucket = await self._ratelimiter.acquire(route)
+            ratelimited = False
+            server_error = None
+
+            try:
+                async with self._transport.session.request(
+                    method=route.method, url=url, headers=headers, data=body, params=params
+                ) as res:
+                    self._ratelimiter.update(route, bucket, res.headers)
 
-                if res.status in [200, 201, 204]:
-                    if text_response:
-                        data = await res.text()
+                    if res.status == 429:
+                        ratelimited = True
+                        delay, is_global = self._parse_ratelimit(await res.read(), res.headers)
+
+                        # The rate limiter does the actual sleeping on the next acquire
+                        self._ratelimiter.handle_ratelimited(bucket, delay, is_global=is_global)
+                        stats.global_ratelimited += is_global
+                        stats.ratelimited += not is_global
+                    elif policy.should_retry_status(res.status):
+                        delay = policy.backoff(attempt)
+                        stats.server_errors += 1
+                        server_error = res.status
                     else:
-                        data = await res.json()
+                        if return_status:
+                            return res.status
+
+                        data = None
+                        if res.status in [200, 201, 204]:
+                            if text_response:
+                                data = await res.text()
+                            else:
+                                raw = await res.read()
+                                data = self.codec.loads(raw) if raw else None
+
+                        if res.status == 400:
+                            raise InvalidRequest("Bad request - Request performed was invalid.")
+
+                        if res.status == 401:
+                            raise MissingPermission(
+                                "Request not authenticated - Check your API token."
+                            )
+
+                        if res.status == 403:
+                            raise MissingPermission(
+                                "Permission not exists - Check your Permissions for API."
+                            )
+
+                        return data
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not policy.retry_connection_errors or attempt + 1 >= policy.max_attempts:
+                    raise
+
+                delay = policy.backoff(attempt)
+                stats.connection_errors += 1
+            finally:
+                bucket.release()
+
+            if attempt + 1 >= policy.max_attempts:
+                break
+
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise RetriesExhausted(f"Retry deadline exceeded for {route.method} {route.path}.")
+
+            logger.debug("Retrying %s %s in %.3fs (attempt %d)", route.method, route.path, delay, attempt + 1)
+            stats.record(delay)
+
+            if not ratelimited:
+                await asyncio.sleep(delay)
+
+        if server_error == 500:
+            # Still a 500 after the last retry, it's raised like before retrying existed
+            raise InvalidRequest(
+                "Internal Server Error - Something went wrong."
+            )
+
+        raise RetriesExhausted(
+            f"Gave up on {route.method} {route.path} after {policy.max_attempts} attempts."
+        )
 
-                if res.status == 400:
-                    raise InvalidRequest("Bad request - Request performed was invalid.")
+    def _parse_ratelimit(self, raw: bytes, headers: Mapping[str, str]) -> tuple[float, bool]:
+        # Discord explains a 429 in its JSON body. Proxies and Cloudflare answer
+        # with HTML or nothing at all, then only the headers are left to go on.
+        try:
+            body = self.codec.loads(raw) if raw else None
+        except ValueError:
+            body = None
 
-                if res.status == 401:
-                    raise MissingPermission(
-                        "Request not authenticated - Check your API token."
-                    )
+        if not isinstance(body, dict):
+            logger.warning("Got a 429 without a JSON body, falling back to the Retry-After header")
+            body = {}
 
-                if res.status == 403:
-                    raise MissingPermission(
-                        "Permission not exists - Check your Permissions for API."
-                    )
+        try:
+            delay = float(body.get("retry_after", headers.get("Retry-After", 1)))
+        except (TypeError, ValueError):
+            delay = 1.0
 
-                if res.status == 429:
-                    raise InvalidRequest("Too many requests - Slow down your requests.")
+        is_global = bool(body.get("global", headers.get("X-RateLimit-Global", "").lower() == "true"))
+        return delay, is_global
 
-                if res.status == 500:
-                    raise InvalidRequest(
-                        "Internal Server Error - Something went wrong."
-                    )
+    async def close(self) -> None:
+        await self._transport.close()
 
-        return data
+    async def get_gateway_bot(self) -> dict:
+        return await self.fetch(Route("GET", "/gateway/bot"), use_cache=False)
 
     async def create_message(self, channel_id: int, content: str) -> None:
         payload = {"content": content}
         await self.fetch(
             Route("POST", f"/channels/{channel_id}/messages"), data=payload
         )
+
+    async def delete_message(self, channel_id: int, message_id: int) -> None:
+        await self.fetch(Route("DELETE", f"/channels/{channel_id}/messages/{message_id}"))
+
+    async def fetch_messages(
+        self,
+        channel_id: int,
+        *,
+        limit: int = HISTORY_PAGE_LIMIT,
+        before: int | None = None,
+        after: int | None = None,
+        around: int | None = None,
+    ) -> list[dict]:
+        params = {"limit": limit}
+        for key, value in (("before", before), ("after", after), ("around", around)):
+            if value is not None:
+                params[key] = str(value)
+
+        return await self.fetch(Route("GET", f"/channels/{channel_id}/messages"), params=params) or []
+
+    async def history(
+        self,
+        channel_id: int,
+        *,
+        limit: int | None = None,
+        before: int | None = None,
+        after: int | None = None,
+    ) -> AsyncIterator[dict]:
+        # Newest first by default, oldest first when paging forward with `after`.
+        # The next page is requested before the current one is handed out, so the
+        # consumer's own work overlaps with the round trip.
+        if before is not None and after is not None:
+            raise ValueError("Pass either before or after, not both.")
+
+        forward = after is not None
+        cursor = after if forward else before
+        remaining = limit
+
+        def request(cursor: int | None, remaining: int | None) -> asyncio.Task[list[dict]]:
+            size = HISTORY_PAGE_LIMIT if remaining is None else min(HISTORY_PAGE_LIMIT, remaining)
+            key = "after" if forward else "before"
+            return asyncio.ensure_future(self.fetch_messages(channel_id, limit=size, **{key: cursor}))
+
+        pending: asyncio.Task[list[dict]] | None = request(cursor, remaining)
+
+        try:
+            while pending is not None:
+                page = await pending
+                size = HISTORY_PAGE_LIMIT if remaining is None else min(HISTORY_PAGE_LIMIT, remaining)
+                pending = None
+
+                if forward:
+                    # Discord hands `after` pages back newest first as well
+                    page.reverse()
+
+                if remaining is not None:
+                    page = page[:remaining]
+                    remaining -= len(page)
+
+                if page and len(page) >= size and remaining != 0:
+                    pending = request(int(page[-1]["id"]), remaining)
+
+                for message in page:
+                    yield message
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def bulk_delete_messages(
+        self,
+        channel_id: int,
+        message_ids: Iterable[int],
+        *,
+        delete_old: bool = True,
+        concurrency: int = 4,
+    ) -> int:
+        # Bulk delete takes 2-100 ids that are less than two weeks old. Anything
+        # older (or a lone id) goes through the single delete route instead.
+        message_ids = list(dict.fromkeys(int(message_id) for message_id in message_ids))
+        recent = [message_id for message_id in message_ids if is_bulk_deletable(message_id)]
+        singles = [message_id for message_id in message_ids if not is_bulk_deletable(message_id)] if delete_old else []
+        route = Route("POST", f"/channels/{channel_id}/messages/bulk-delete")
+
+        chunks = []
+        for chunk in chunked(recent, BULK_DELETE_LIMIT):
+            if len(chunk) == 1:
+                singles.extend(chunk)
+            else:
+                chunks.append(chunk)
+
+        async def delete_chunk(chunk: list[int]) -> None:
+            await self.fetch(route, data={"messages": [str(message_id) for message_id in chunk]})
+
+        async def delete_single(message_id: int) -> None:
+            await self.delete_message(channel_id, message_id)
+
+        await map_concurrent(delete_chunk, chunks, concurrency=concurrency)
+        await map_concurrent(delete_single, singles, concurrency=concurrency)
+
+        return sum(map(len, chunks)) + len(singles)
+
+    async def map(
+        self,
+        func: Callable[[Any], Awaitable[Any]],
+        ids: Iterable[Any],
+        *,
+        concurrency: int = 8,
+        return_exceptions: bool = False,
+    ) -> list[Any]:
+        # Every call still goes through `fetch`, so it waits on its own rate limit
+        # bucket. Results come back in the order of `ids`.
+        return await map_concurrent(func, ids, concurrency=concurrency, return_exceptions=return_exceptions)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import attrs
+import random
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class RetryPolicy:
+    max_attempts: int = 5
+    deadline: float | None = None
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_statuses: frozenset[int] = frozenset({500, 502, 503, 504})
+    retry_connection_errors: bool = True
+
+    def backoff(self, attempt: int) -> float:
+        # "Full jitter", spreads the retries of concurrent callers out so they
+        # don't hit the API again in lockstep.
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def should_retry_status(self, status: int) -> bool:
+        return status in self.retry_statuses
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class RouteRetryStats:
+    retries: int = 0
+    ratelimited: int = 0
+    global_ratelimited: int = 0
+    server_errors: int = 0
+    connection_errors: int = 0
+    sleep_time: float = 0.0
+
+    def record(self, delay: float) -> None:
+        self.retries += 1
+        self.sleep_time += delay
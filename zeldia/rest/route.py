@@ -1,8 +1,15 @@
 from __future__ import annotations
 
+import re
 import typing as t
 
 
+MAJOR_PARAMETER_REGEX: t.Final[re.Pattern[str]] = re.compile(
+    r"^/(?P<resource>channels|guilds|webhooks)/(?P<id>\d+)(?:/(?P<token>[^/]+))?"
+)
+SNOWFLAKE_SEGMENT_REGEX: t.Final[re.Pattern[str]] = re.compile(r"/\d+(?=/|$)")
+
+
 class Route:
     BASE_URL = "https://discord.com/api/v10"
 
@@ -12,6 +19,9 @@ class Route:
         self.method = method.upper()
         self.path = path
 
+    def __repr__(self) -> str:
+        return f"Route(method={self.method!r}, path={self.path!r})"
+
     @property
     def base_url(self) -> str:
         return self.BASE_URL
@@ -23,3 +33,30 @@ class Route:
     @property
     def url(self) -> str:
         return self.base_url + self.path
+
+    @property
+    def major_parameter(self) -> str | None:
+        match = MAJOR_PARAMETER_REGEX.match(self.path)
+
+        if match is None:
+            return None
+
+        # Webhook buckets are scoped to the id *and* the token
+        if match["resource"] == "webhooks" and match["token"]:
+            return f"{match['id']}:{match['token']}"
+
+        return match["id"]
+
+    @property
+    def template(self) -> str:
+        path = SNOWFLAKE_SEGMENT_REGEX.sub("/{id}", self.path)
+        match = MAJOR_PARAMETER_REGEX.match(self.path)
+
+        if match is not None and match["resource"] == "webhooks" and match["token"]:
+            path = path.replace(f"/{match['token']}", "/{token}", 1)
+
+        return path
+
+    @property
+    def route_key(self) -> str:
+        return f"{self.method} {self.template}"
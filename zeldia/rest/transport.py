@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import aiohttp
+import attrs
+import time
+
+from typing import Any, Sequence
+
+
+@attrs.define(kw_only=True, slots=True, frozen=True, repr=True)
+class TransportSettings:
+    limit: int = 100
+    limit_per_host: int = 0
+    keepalive_timeout: float = 30.0
+    ttl_dns_cache: int | None = 300
+    use_dns_cache: bool = True
+    # Only bounds connecting, REST calls bring their own timeouts and websockets live for hours
+    connect_timeout: float | None = 10.0
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class PoolStats:
+    requests: int = 0
+    in_flight: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    queued: int = 0
+    wait_time: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        # Only counts requests that actually had to queue for a free connection
+        return self.wait_time / self.queued if self.queued else 0.0
+
+    @property
+    def reuse_rate(self) -> float:
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else 0.0
+
+
+class HTTPTransport:
+    # One pooled session for REST, shared by every shard. Gateway websockets get
+    # a session of their own: each one holds its connection for the life of the
+    # shard, in the REST pool they would eat into `limit` until nothing is left.
+    # Sessions are only created once a loop is running, sessions made at import
+    # time end up bound to no loop.
+
+    __slots__: Sequence[str] = ("settings", "stats", "_session", "_owned", "_websocket_session")
+
+    def __init__(
+        self,
+        settings: TransportSettings | None = None,
+        session: aiohttp.ClientSession | None = None,
+    ) -> None:
+        self.settings = TransportSettings() if settings is None else settings
+        self.stats = PoolStats()
+
+        # A session handed in from outside belongs to the caller, we never close it
+        self._session = session
+        self._owned = session is None
+        self._websocket_session: aiohttp.ClientSession | None = None
+
+    def __repr__(self) -> str:
+        return f"HTTPTransport(open={self.open_connections}, idle={self.idle_connections}, closed={self.closed})"
+
+    @property
+    def closed(self) -> bool:
+        return self._session is None or self._session.closed
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or (self._owned and self._session.closed):
+            self._session = self._create_session()
+
+        return self._session
+
+    @property
+    def websocket_session(self) -> aiohttp.ClientSession:
+        if self._websocket_session is None or self._websocket_session.closed:
+            settings = self.settings
+            # No limit, there's exactly one connection per shard and none of them is ever returned
+            connector = aiohttp.TCPConnector(
+                limit=0,
+                ttl_dns_cache=settings.ttl_dns_cache,
+                use_dns_cache=settings.use_dns_cache,
+            )
+            self._websocket_session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=settings.connect_timeout),
+            )
+
+        return self._websocket_session
+
+    @property
+    def open_connections(self) -> int:
+        # aiohttp doesn't expose its pool, these are the connector's own bookkeeping
+        connector = None if self._session is None else self._session.connector
+        if connector is None:
+            return 0
+
+        return len(getattr(connector, "_acquired", ())) + self.idle_connections
+
+    @property
+    def idle_connections(self) -> int:
+        connector = None if self._session is None else self._session.connector
+        if connector is None:
+            return 0
+
+        return sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        settings = self.settings
+        connector = aiohttp.TCPConnector(
+            limit=settings.limit,
+            limit_per_host=settings.limit_per_host,
+            keepalive_timeout=settings.keepalive_timeout,
+            ttl_dns_cache=settings.ttl_dns_cache,
+            use_dns_cache=settings.use_dns_cache,
+        )
+
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=settings.connect_timeout),
+            trace_configs=[self._trace_config()],
+        )
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        stats = self.stats
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_start(_: Any, ctx: Any, __: Any) -> None:
+            stats.requests += 1
+            stats.in_flight += 1
+
+        async def on_request_end(_: Any, ctx: Any, __: Any) -> None:
+            stats.in_flight -= 1
+
+        async def on_connection_queued_start(_: Any, ctx: Any, __: Any) -> None:
+            stats.queued += 1
+            ctx.queued_at = time.perf_counter()
+
+        async def on_connection_queued_end(_: Any, ctx: Any, __: Any) -> None:
+            waited = time.perf_counter() - ctx.queued_at
+            stats.wait_time += waited
+            stats.max_wait = max(stats.max_wait, waited)
+
+        async def on_connection_create_end(*_: Any) -> None:
+            stats.connections_created += 1
+
+        async def on_connection_reuseconn(*_: Any) -> None:
+            stats.connections_reused += 1
+
+        trace.on_request_start.append(on_request_start)
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_end)
+        trace.on_connection_queued_start.append(on_connection_queued_start)
+        trace.on_connection_queued_end.append(on_connection_queued_end)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        return trace
+
+    async def close(self) -> None:
+        websocket_session, self._websocket_session = self._websocket_session, None
+        if websocket_session is not None and not websocket_session.closed:
+            await websocket_session.close()
+
+        if self._session is None or not self._owned:
+            return
+
+        session, self._session = self._session, None
+        if not session.closed:
+            await session.close()
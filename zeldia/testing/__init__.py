@@ -0,0 +1,12 @@
+from zeldia.testing.gateway import FakeConnection, FakeGateway, member_payload, message_payload
+from zeldia.testing.rest import FakeBucket, FakeREST
+
+
+__all__: tuple[str, ...] = (
+    "FakeBucket",
+    "FakeConnection",
+    "FakeGateway",
+    "FakeREST",
+    "member_payload",
+    "message_payload",
+)
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import attrs
+import logging
+import multiprocessing
+import time
+import tracemalloc
+
+from multiprocessing.connection import Connection
+from typing import Any, Sequence
+
+from zeldia.gateway.runner import LatencyHistogram
+from zeldia.gateway.shard import IdentifyLimiter
+from zeldia.rest.ratelimit import GlobalRateLimit, RateLimiter
+from zeldia.rest.rest import RESTClient
+from zeldia.rest.route import Route
+from zeldia.testing.gateway import FakeGateway, message_payload
+from zeldia.testing.rest import FakeREST
+
+# Runs the client against the fake servers and reports throughput and latency.
+# The servers live in their own process so their CPU time and memory don't end
+# up in the numbers. `python -m zeldia.testing.bench --help`
+
+GATEWAY_CONFIGS: dict[str, dict[str, Any]] = {
+    "json": {"codec": "json"},
+    "orjson": {"codec": "orjson"},
+    "lazy": {"lazy_models": True},
+    "typed": {"typed_decoding": True},
+    "etf": {"encoding": "etf"},
+    "zlib-stream": {"zlib_compression": True},
+}
+
+
+@attrs.define(kw_only=True, slots=True, repr=True)
+class BenchResult:
+    name: str
+    metrics: dict[str, float] = attrs.field(factory=dict)
+    error: str | None = None
+
+    def format(self) -> str:
+        if self.error is not None:
+            return f"{self.name:<24} skipped: {self.error}"
+
+        return f"{self.name:<24} " + "  ".join(f"{key}={_format(value)}" for key, value in self.metrics.items())
+
+
+def _format(value: float) -> str:
+    if isinstance(value, int) or value >= 100:
+        return f"{value:,.0f}"
+
+    return f"{value:.3f}"
+
+
+def stamped_message(_: int) -> dict[str, Any]:
+    # The id carries the send time, monotonic_ns is system wide so the client
+    # process can take the difference. Every model type keeps the id around.
+    return message_payload(message_id=time.monotonic_ns())
+
+
+async def _serve(kind: str, options: dict[str, Any], conn: Connection) -> None:
+    server: Any = FakeGateway(**options) if kind == "gateway" else FakeREST(**options)
+    await server.start()
+    conn.send(server.port)
+
+    loop = asyncio.get_running_loop()
+    while True:
+        command, args = await loop.run_in_executor(None, conn.recv)
+
+        if command == "stop":
+            break
+        if command == "wait_ready":
+            conn.send(len(await server.wait_ready(*args)))
+        elif command == "stream":
+            conn.send(await server.stream("MESSAGE_CREATE", stamped_message, *args))
+        elif command == "stats":
+            conn.send({"requests": server.requests, "ratelimited": server.ratelimited})
+
+    await server.stop()
+    conn.send(None)
+
+
+def _run_server(kind: str, options: dict[str, Any], conn: Connection) -> None:
+    asyncio.run(_serve(kind, options, conn))
+
+
+class ServerProcess:
+
+    __slots__: Sequence[str] = ("kind", "port", "_process", "_conn")
+
+    def __init__(self, kind: str, **options: Any) -> None:
+        context = multiprocessing.get_context("spawn")
+        self._conn, child = context.Pipe()
+        self._process = context.Process(target=_run_server, args=(kind, options, child), daemon=True)
+        self._process.start()
+        child.close()
+
+        self.kind = kind
+        self.port: int = self._conn.recv()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def call(self, command: str, *args: Any) -> Any:
+        self._conn.send((command, args))
+        return await asyncio.get_running_loop().run_in_executor(None, self._conn.recv)
+
+    async def close(self) -> None:
+        await self.call("stop")
+        self._process.join(5)
+
+
+async def bench_gateway(
+    name: str,
+    events: int = 20_000,
+    rate: float | None = None,
+    **client_options: Any,
+) -> BenchResult:
+    from zeldia.client import GatewayClient
+
+    server = ServerProcess("gateway")
+    try:
+        client = GatewayClient(
+            "token",
+            intents=1,
+            gateway_url=f"{server.base_url}/?v=10&encoding=json",
+            **client_options,
+        )
+    except (ImportError, ValueError) as error:
+        await server.close()
+        return BenchResult(name=name, error=str(error))
+
+    latencies = LatencyHistogram(size=events)
+    done = asyncio.Event()
+
+    @client.on("MESSAGE_CREATE")
+    async def on_message(message: Any) -> None:
+        latencies.record((time.monotonic_ns() - int(message.id)) / 1e9)
+        if len(latencies) == events:
+            done.set()
+
+    task = asyncio.ensure_future(client.shards.start())
+    try:
+        await server.call("wait_ready", 1)
+        started = time.perf_counter()
+        await server.call("stream", events, rate)
+        await asyncio.wait_for(done.wait(), 60)
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.close()
+        task.cancel()
+        await server.close()
+
+    stats = client.gateway.transport_stats
+    return BenchResult(
+        name=f"gateway[{name}]",
+        metrics={
+            "events/s": events / elapsed,
+            "p50_ms": latencies.percentile(50) * 1e3,
+            "p99_ms": latencies.percentile(99) * 1e3,
+            "bytes/msg": stats.bytes_per_message,
+            "cpu_us/msg": stats.cpu_per_message * 1e6,
+        },
+    )
+
+
+async def bench_memory(connections: int = 50) -> BenchResult:
+    from zeldia.client import GatewayClient
+
+    server = ServerProcess("gateway")
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    client = GatewayClient(
+        "token",
+        intents=1,
+        gateway_url=f"{server.base_url}/?v=10&encoding=json",
+        shard_count=connections,
+        identify_limiter=IdentifyLimiter(connections, interval=0),
+    )
+    task = asyncio.ensure_future(client.shards.start())
+
+    try:
+        await server.call("wait_ready", connections)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+        await client.close()
+        task.cancel()
+        await server.close()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return BenchResult(
+        name="gateway[memory]",
+        metrics={"connections": connections, "bytes/conn": allocated / connections},
+    )
+
+
+async def bench_rest(
+    requests: int = 2_000,
+    concurrency: int = 50,
+    latency: float = 0.0,
+    ratelimit_every: int | None = None,
+) -> BenchResult:
+    # Spread over many channels so bucket limits don't dominate, and a global
+    # limit high enough to stay out of the way: this measures the client.
+    channels = max(1, concurrency)
+    server = ServerProcess(
+        "rest",
+        latency=latency,
+        bucket_limit=max(5, requests // channels + 1),
+        ratelimit_every=ratelimit_every,
+    )
+    rest = RESTClient(
+        "token",
+        base_url=f"{server.base_url}/api/v10",
+        ratelimiter=RateLimiter(GlobalRateLimit(limit=1_000_000)),
+    )
+    latencies = LatencyHistogram(size=requests)
+
+    async def request(index: int) -> None:
+        started = time.perf_counter()
+        await rest.fetch(Route("GET", f"/channels/{index % channels}/messages"), use_cache=False)
+        latencies.record(time.perf_counter() - started)
+
+    try:
+        started = time.perf_counter()
+        await rest.map(request, range(requests), concurrency=concurrency)
+        elapsed = time.perf_counter() - started
+        server_stats = await server.call("stats")
+    finally:
+        await rest.close()
+        await server.close()
+
+    return BenchResult(
+        name="rest",
+        metrics={
+            "req/s": requests / elapsed,
+            "p50_ms": latencies.percentile(50) * 1e3,
+            "p99_ms": latencies.percentile(99) * 1e3,
+            "429s": server_stats["ratelimited"],
+            "connections": rest.transport.stats.connections_created,
+        },
+    )
+
+
+async def run(args: argparse.Namespace) -> list[BenchResult]:
+    results = []
+    configs = args.configs or list(GATEWAY_CONFIGS)
+
+    for name in configs:
+        results.append(await bench_gateway(name, args.events, args.rate, **GATEWAY_CONFIGS[name]))
+        print(results[-1].format(), flush=True)
+
+    if not args.skip_memory:
+        results.append(await bench_memory(args.connections))
+        print(results[-1].format(), flush=True)
+
+    if not args.skip_rest:
+        results.append(await bench_rest(args.requests, args.concurrency, args.latency, args.ratelimit_every))
+        print(results[-1].format(), flush=True)
+
+    return results
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m zeldia.testing.bench")
+    parser.add_argument("--events", type=int, default=20_000, help="MESSAGE_CREATE events per gateway run")
+    parser.add_argument("--rate", type=float, default=None, help="events per second, unpaced if omitted")
+    parser.add_argument("--config", dest="configs", action="append", choices=list(GATEWAY_CONFIGS))
+    parser.add_argument("--connections", type=int, default=50, help="shards for the memory run")
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the fake API waits per request")
+    parser.add_argument("--ratelimit-every", type=int, default=None, help="answer every nth request with a 429")
+    parser.add_argument("--skip-memory", action="store_true")
+    parser.add_argument("--skip-rest", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
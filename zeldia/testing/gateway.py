@@ -0,0 +1,376 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+import uuid
+import zlib
+
+from typing import Any, Callable, Dict, Sequence
+
+from aiohttp import web
+
+from zeldia.enums.opcodes import OPCodes
+from zeldia.gateway import etf
+
+
+PayloadFactoryT = Callable[[int], Dict[str, Any]]
+
+
+class FakeConnection:
+
+    __slots__: Sequence[str] = (
+        "ws",
+        "encoding",
+        "compress",
+        "session_id",
+        "shard",
+        "sequence",
+        "heartbeats",
+        "ready",
+        "bytes_sent",
+        "_compressor",
+    )
+
+    def __init__(self, ws: web.WebSocketResponse, encoding: str, compress: str | None) -> None:
+        self.ws = ws
+        self.encoding = encoding
+        self.compress = compress
+        self.session_id: str | None = None
+        self.shard: list[int] | None = None
+        self.sequence = 0
+        self.heartbeats = 0
+        self.ready = asyncio.Event()
+        self.bytes_sent = 0
+        self._compressor = zlib.compressobj() if compress == "zlib-stream" else None
+
+    def __repr__(self) -> str:
+        return f"FakeConnection(session_id={self.session_id!r}, shard={self.shard}, sequence={self.sequence})"
+
+    @property
+    def closed(self) -> bool:
+        return self.ws.closed
+
+    def encode(self, payload: dict[str, Any]) -> bytes | str:
+        data: bytes | str
+        if self.encoding == "etf":
+            data = etf.encode(payload)
+        else:
+            data = json.dumps(payload, separators=(",", ":"))
+
+        if self._compressor is not None:
+            if isinstance(data, str):
+                data = data.encode()
+            # One sync flush per message, which is what puts the 00 00 ff ff suffix on it
+            data = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        return data
+
+    async def send(self, payload: dict[str, Any]) -> None:
+        data = self.encode(payload)
+        self.bytes_sent += len(data)
+
+        if isinstance(data, str):
+            await self.ws.send_str(data)
+        else:
+            await self.ws.send_bytes(data)
+
+    async def dispatch(self, event: str, data: Any) -> None:
+        self.sequence += 1
+        await self.send({"t": event, "s": self.sequence, "op": OPCodes.DISPATCH, "d": data})
+
+    async def close(self, code: int = 1000) -> None:
+        await self.ws.close(code=code)
+
+
+class FakeGateway:
+    # Speaks enough of the gateway protocol for Gateway and GatewayClient to run
+    # against it: HELLO, IDENTIFY/RESUME, heartbeats, dispatches, and the ways a
+    # real gateway kicks clients around (RECONNECT, INVALID_SESSION, closes).
+
+    __slots__: Sequence[str] = (
+        "host",
+        "port",
+        "heartbeat_interval",
+        "ack_heartbeats",
+        "user",
+        "connections",
+        "identifies",
+        "resumes",
+        "presences",
+        "members",
+        "member_requests",
+        "chunk_size",
+        "_sessions",
+        "_runner",
+        "_connected",
+    )
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        heartbeat_interval: float = 41.25,
+        ack_heartbeats: bool = True,
+        user: dict[str, Any] | None = None,
+        chunk_size: int = 1000,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.heartbeat_interval = heartbeat_interval
+        self.ack_heartbeats = ack_heartbeats
+        self.user = user or {"id": "1", "username": "zeldia", "discriminator": "0", "bot": True}
+
+        self.connections: list[FakeConnection] = []
+        self.identifies = 0
+        self.resumes = 0
+        self.presences: list[dict[str, Any]] = []
+        # Member payloads per guild id, served in answer to REQUEST_GUILD_MEMBERS
+        self.members: dict[int, list[dict[str, Any]]] = {}
+        self.member_requests: list[dict[str, Any]] = []
+        self.chunk_size = chunk_size
+
+        self._sessions: dict[str, int] = {}
+        self._runner: web.AppRunner | None = None
+        self._connected = asyncio.Condition()
+
+    def __repr__(self) -> str:
+        return f"FakeGateway(url={self.url!r}, connections={len(self.active)})"
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/?v=10&encoding=json"
+
+    @property
+    def active(self) -> list[FakeConnection]:
+        return [connection for connection in self.connections if not connection.closed]
+
+    async def start(self) -> FakeGateway:
+        app = web.Application()
+        app.router.add_get("/", self._handle)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+        # Port 0 picks a free one, read back which
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self) -> None:
+        for connection in self.active:
+            await connection.close(1001)
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> FakeGateway:
+        return await self.start()
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.stop()
+
+    async def wait_ready(self, count: int = 1, timeout: float | None = 10.0) -> list[FakeConnection]:
+        async def wait() -> list[FakeConnection]:
+            async with self._connected:
+                await self._connected.wait_for(
+                    lambda: sum(connection.ready.is_set() for connection in self.active) >= count
+                )
+
+            return [connection for connection in self.active if connection.ready.is_set()]
+
+        return await asyncio.wait_for(wait(), timeout)
+
+    async def dispatch(self, event: str, data: Any) -> None:
+        for connection in self.active:
+            if connection.ready.is_set():
+                await connection.dispatch(event, data)
+
+    async def stream(
+        self,
+        event: str,
+        data: dict[str, Any] | PayloadFactoryT,
+        count: int,
+        rate: float | None = None,
+        batch: int = 100,
+    ) -> float:
+        # Sends `count` events to every ready connection, paced to `rate` per second
+        # if given, and returns how long that took. `data` may be a factory taking
+        # the event's index, e.g. to stamp send times into it.
+        factory = data if callable(data) else lambda _: data
+        connections = [connection for connection in self.active if connection.ready.is_set()]
+        started = time.perf_counter()
+
+        for index in range(count):
+            payload = factory(index)
+            for connection in connections:
+                await connection.dispatch(event, payload)
+
+            if rate is not None:
+                ahead = (index + 1) / rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+            elif index % batch == batch - 1:
+                # Unpaced streams still let the other side of the loop run now and then
+                await asyncio.sleep(0)
+
+        return time.perf_counter() - started
+
+    async def inject_reconnect(self) -> None:
+        for connection in self.active:
+            await connection.send({"op": OPCodes.RECONNECT, "d": None})
+
+    async def inject_invalid_session(self, resumable: bool = False) -> None:
+        for connection in self.active:
+            if not resumable and connection.session_id is not None:
+                self._sessions.pop(connection.session_id, None)
+            await connection.send({"op": OPCodes.INVALIDATE_SESSION, "d": resumable})
+
+    async def close_all(self, code: int = 4000) -> None:
+        for connection in self.active:
+            await connection.close(code)
+
+    def _ready_payload(self, connection: FakeConnection) -> dict[str, Any]:
+        return {
+            "v": 10,
+            "user": self.user,
+            "guilds": [],
+            "session_id": connection.session_id,
+            "resume_gateway_url": self.base_url,
+            "shard": connection.shard or [0, 1],
+            "application": {"id": self.user["id"], "flags": 0},
+        }
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        connection = FakeConnection(ws, request.query.get("encoding", "json"), request.query.get("compress"))
+        self.connections.append(connection)
+
+        await connection.send({"op": OPCodes.HELLO, "d": {"heartbeat_interval": self.heartbeat_interval * 1000}})
+
+        async for message in ws:
+            if message.type == web.WSMsgType.TEXT:
+                payload = json.loads(message.data)
+            elif message.type == web.WSMsgType.BINARY:
+                payload = etf.decode(message.data)
+            else:
+                break
+
+            try:
+                await self._handle_payload(connection, payload)
+            except ConnectionResetError:
+                break
+
+        if connection.session_id is not None and connection.session_id in self._sessions:
+            self._sessions[connection.session_id] = connection.sequence
+
+        async with self._connected:
+            self._connected.notify_all()
+
+        return ws
+
+    async def _handle_payload(self, connection: FakeConnection, payload: dict[str, Any]) -> None:
+        op = payload.get("op")
+        data = payload.get("d")
+
+        if op == OPCodes.HEARTBEAT:
+            connection.heartbeats += 1
+            if self.ack_heartbeats:
+                await connection.send({"op": OPCodes.HEARTBEAT_ACK})
+        elif op == OPCodes.IDENTIFY:
+            self.identifies += 1
+            connection.session_id = uuid.uuid4().hex
+            connection.shard = data.get("shard")
+            self._sessions[connection.session_id] = 0
+            await connection.dispatch("READY", self._ready_payload(connection))
+            await self._mark_ready(connection)
+        elif op == OPCodes.RESUME:
+            sequence = self._sessions.get(data.get("session_id"))
+            if sequence is None:
+                await connection.send({"op": OPCodes.INVALIDATE_SESSION, "d": False})
+                return
+
+            self.resumes += 1
+            connection.session_id = data["session_id"]
+            connection.sequence = max(sequence, data.get("seq") or 0)
+            await connection.dispatch("RESUMED", None)
+            await self._mark_ready(connection)
+        elif op == OPCodes.PRESENCE_UPDATE:
+            self.presences.append(data)
+        elif op == OPCodes.REQUEST_GUILD_MEMBERS:
+            self.member_requests.append(data)
+            await self._send_member_chunks(connection, data)
+
+    async def _send_member_chunks(self, connection: FakeConnection, data: dict[str, Any]) -> None:
+        guild_id = int(data["guild_id"])
+        members = self.members.get(guild_id, [])
+        not_found: list[str] = []
+
+        if data.get("user_ids") is not None:
+            by_id = {int(member["user"]["id"]): member for member in members}
+            wanted = [int(user_id) for user_id in data["user_ids"]]
+            members = [by_id[user_id] for user_id in wanted if user_id in by_id]
+            not_found = [str(user_id) for user_id in wanted if user_id not in by_id]
+        else:
+            query = (data.get("query") or "").lower()
+            members = [member for member in members if member["user"]["username"].lower().startswith(query)]
+            if data.get("limit"):
+                members = members[: data["limit"]]
+
+        chunks = [members[start : start + self.chunk_size] for start in range(0, len(members), self.chunk_size)] or [[]]
+        for index, chunk in enumerate(chunks):
+            payload = {
+                "guild_id": str(guild_id),
+                "members": chunk,
+                "chunk_index": index,
+                "chunk_count": len(chunks),
+                "nonce": data.get("nonce"),
+            }
+            if index == 0 and not_found:
+                payload["not_found"] = not_found
+
+            await connection.dispatch("GUILD_MEMBERS_CHUNK", payload)
+
+    async def _mark_ready(self, connection: FakeConnection) -> None:
+        connection.ready.set()
+        async with self._connected:
+            self._connected.notify_all()
+
+
+_snowflakes = itertools.count(1 << 40)
+
+
+def member_payload(user_id: int, username: str | None = None) -> dict[str, Any]:
+    return {
+        "user": {"id": str(user_id), "username": username or f"user{user_id}", "discriminator": "0"},
+        "roles": [],
+        "joined_at": "2022-11-01T12:34:56.789000+00:00",
+        "deaf": False,
+        "mute": False,
+    }
+
+
+def message_payload(channel_id: int = 1, content: str = "hello", message_id: int | None = None) -> dict[str, Any]:
+    return {
+        "id": str(next(_snowflakes) if message_id is None else message_id),
+        "channel_id": str(channel_id),
+        "author": {"id": "2", "username": "someone", "discriminator": "0"},
+        "content": content,
+        "timestamp": "2022-11-01T12:34:56.789000+00:00",
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import json
+import time
+
+from typing import Any, Awaitable, Callable, Sequence
+
+from aiohttp import web
+
+from zeldia.rest.route import Route
+
+
+HandlerT = Callable[[web.Request], Awaitable[Any]]
+
+
+class FakeBucket:
+
+    __slots__: Sequence[str] = ("key", "limit", "remaining", "reset_at")
+
+    def __init__(self, key: str, limit: int) -> None:
+        self.key = key
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = 0.0
+
+
+class FakeREST:
+    # A stand-in for the REST API. Every route answers, with the registered handler
+    # or an empty object, and is rate limited per (route template, major parameter)
+    # with the same headers Discord sends. `ratelimit_every` forces a 429 on every
+    # nth request on top of that.
+
+    __slots__: Sequence[str] = (
+        "host",
+        "port",
+        "latency",
+        "bucket_limit",
+        "bucket_period",
+        "ratelimit_every",
+        "retry_after",
+        "gateway_url",
+        "requests",
+        "ratelimited",
+        "routes",
+        "_handlers",
+        "_buckets",
+        "_runner",
+    )
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        bucket_limit: int = 5,
+        bucket_period: float = 1.0,
+        ratelimit_every: int | None = None,
+        retry_after: float = 0.05,
+        gateway_url: str | None = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.bucket_limit = bucket_limit
+        self.bucket_period = bucket_period
+        self.ratelimit_every = ratelimit_every
+        self.retry_after = retry_after
+        self.gateway_url = gateway_url
+
+        self.requests = 0
+        self.ratelimited = 0
+        self.routes: collections.Counter[str] = collections.Counter()
+
+        self._handlers: dict[tuple[str, str], HandlerT] = {("GET", "/gateway/bot"): self._gateway_bot}
+        self._buckets: dict[str, FakeBucket] = {}
+        self._runner: web.AppRunner | None = None
+
+    def __repr__(self) -> str:
+        return f"FakeREST(base_url={self.base_url!r}, requests={self.requests}, ratelimited={self.ratelimited})"
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v10"
+
+    def route(self, method: str, template: str) -> Callable[[HandlerT], HandlerT]:
+        # Templates use the same shape as Route.template, e.g. /channels/{id}/messages
+        def register(handler: HandlerT) -> HandlerT:
+            self._handlers[(method.upper(), template)] = handler
+            return handler
+
+        return register
+
+    async def start(self) -> FakeREST:
+        app = web.Application()
+        app.router.add_route("*", "/api/v10/{path:.*}", self._handle)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> FakeREST:
+        return await self.start()
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.stop()
+
+    async def _gateway_bot(self, _: web.Request) -> dict[str, Any]:
+        return {
+            "url": self.gateway_url or "wss://gateway.discord.gg",
+            "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        }
+
+    def _bucket(self, route: Route) -> FakeBucket:
+        key = f"{route.route_key}:{route.major_parameter}"
+        bucket = self._buckets.get(key)
+
+        if bucket is None:
+            bucket = self._buckets[key] = FakeBucket(key, self.bucket_limit)
+
+        return bucket
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        route = Route(request.method, f"/{request.match_info['path']}")
+        self.routes[route.route_key] += 1
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        bucket = self._bucket(route)
+        now = time.monotonic()
+        if bucket.reset_at <= now:
+            bucket.remaining = bucket.limit
+            bucket.reset_at = now + self.bucket_period
+
+        headers = {
+            "X-RateLimit-Limit": str(bucket.limit),
+            "X-RateLimit-Bucket": bucket.key,
+        }
+
+        forced = self.ratelimit_every is not None and self.requests % self.ratelimit_every == 0
+        if bucket.remaining <= 0 or forced:
+            self.ratelimited += 1
+            retry_after = self.retry_after if forced else bucket.reset_at - now
+            headers.update({"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": f"{retry_after:.3f}"})
+
+            body = {"message": "You are being rate limited.", "retry_after": retry_after, "global": False}
+            return web.Response(
+                status=429,
+                text=json.dumps(body),
+                headers={**headers, "Retry-After": f"{retry_after:.3f}"},
+                content_type="application/json",
+            )
+
+        bucket.remaining -= 1
+        headers.update(
+            {
+                "X-RateLimit-Remaining": str(bucket.remaining),
+                "X-RateLimit-Reset-After": f"{bucket.reset_at - now:.3f}",
+            }
+        )
+
+        handler = self._handlers.get((route.method, route.template))
+        body = {} if handler is None else await handler(request)
+
+        if isinstance(body, web.Response):
+            body.headers.update(headers)
+            return body
+
+        if body is None:
+            return web.Response(status=204, headers=headers)
+
+        return web.Response(text=json.dumps(body), headers=headers, content_type="application/json")
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+
+from typing import Any, AsyncIterator, Callable, Sequence
+
+from zeldia.enums.overflow_policy import OverflowPolicy
+from zeldia.exceptions import StreamOverflow
+
+CheckT = Callable[..., bool]
+
+
+def _result(args: tuple) -> Any:
+    return args[0] if len(args) == 1 else args
+
+
+class Waiter:
+
+    __slots__: Sequence[str] = ("event", "check", "future")
+
+    def __init__(self, event: str, check: CheckT | None) -> None:
+        self.event = event
+        self.check = check
+        self.future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+
+    def feed(self, args: tuple) -> bool:
+        # Returns True once the waiter is done and can be dropped
+        if self.future.done():
+            return True
+
+        try:
+            if self.check is not None and not self.check(*args):
+                return False
+        except Exception as error:
+            self.future.set_exception(error)
+            return True
+
+        self.future.set_result(_result(args))
+        return True
+
+
+class EventStream:
+
+    __slots__: Sequence[str] = (
+        "event",
+        "check",
+        "maxsize",
+        "overflow",
+        "timeout",
+        "dropped",
+        "_registry",
+        "_queue",
+        "_ready",
+        "_closed",
+        "_error",
+    )
+
+    def __init__(
+        self,
+        registry: WaiterRegistry,
+        event: str,
+        check: CheckT | None = None,
+        maxsize: int = 100,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        timeout: float | None = None,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("A stream needs room for at least one event.")
+
+        self.event = event
+        self.check = check
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.timeout = timeout
+        self.dropped = 0
+
+        self._registry = registry
+        self._queue: collections.deque[Any] = collections.deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._error: Exception | None = None
+
+    def __repr__(self) -> str:
+        return f"EventStream(event={self.event!r}, queued={len(self._queue)}, dropped={self.dropped})"
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def feed(self, args: tuple) -> bool:
+        if self._closed:
+            return True
+
+        try:
+            if self.check is not None and not self.check(*args):
+                return False
+        except Exception as error:
+            self.close(error)
+            return True
+
+        if len(self._queue) >= self.maxsize:
+            self.dropped += 1
+
+            if self.overflow is OverflowPolicy.DROP_NEWEST:
+                return False
+            if self.overflow is OverflowPolicy.CLOSE:
+                self.close(StreamOverflow(f"{self.event} stream overflowed its {self.maxsize} slots."))
+                return True
+
+            self._queue.popleft()
+
+        self._queue.append(_result(args))
+        self._ready.set()
+        return False
+
+    def close(self, error: Exception | None = None) -> None:
+        if self._closed:
+            return
+
+        self._closed = True
+        self._error = error
+        self._ready.set()
+        self._registry.remove(self)
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self
+
+    async def __anext__(self) -> Any:
+        while not self._queue:
+            if self._closed:
+                if self._error is not None:
+                    raise self._error
+                raise StopAsyncIteration
+
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                # Nothing arrived in time, the stream just ends
+                self.close()
+                raise StopAsyncIteration from None
+
+        return self._queue.popleft()
+
+    async def __aenter__(self) -> EventStream:
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        self.close()
+
+
+class WaiterRegistry:
+    # Waiters and streams are indexed by event name, so a dispatch only touches
+    # the ones waiting on that event. Dicts keep insertion order and O(1) removal.
+
+    __slots__: Sequence[str] = ("_listeners",)
+
+    def __init__(self) -> None:
+        self._listeners: dict[str, dict[Waiter | EventStream, None]] = {}
+
+    def __contains__(self, event: str) -> bool:
+        return event in self._listeners
+
+    def __len__(self) -> int:
+        return sum(len(listeners) for listeners in self._listeners.values())
+
+    def add(self, listener: Waiter | EventStream) -> None:
+        self._listeners.setdefault(listener.event, {})[listener] = None
+
+    def remove(self, listener: Waiter | EventStream) -> None:
+        listeners = self._listeners.get(listener.event)
+        if listeners is None:
+            return
+
+        listeners.pop(listener, None)
+        if not listeners:
+            del self._listeners[listener.event]
+
+    def notify(self, event: str, args: tuple) -> None:
+        listeners = self._listeners.get(event)
+        if not listeners:
+            return
+
+        for listener in tuple(listeners):
+            if listener.feed(args):
+                self.remove(listener)
+
+    async def wait_for(self, event: str, check: CheckT | None = None, timeout: float | None = None) -> Any:
+        waiter = Waiter(event, check)
+        self.add(waiter)
+
+        try:
+            return await asyncio.wait_for(waiter.future, timeout)
+        finally:
+            self.remove(waiter)